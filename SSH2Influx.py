@@ -11,19 +11,94 @@
     injection to InfluxDB.
 
     Args:
-    usage: SSH2Influx.py [-h] [-d] -p paramfile [-g group] [-f frequency]
+    usage: SSH2Influx.py [-h] [-d] -p paramfile [paramfile ...]
+                         [-g group] [-f frequency]
+                         [-t threads] [-c concurrency] [--adaptive]
+                         [--login-rate logins] [--user-login-rate logins]
+                         [-m commandmode]
+                         [--pipeline depth] [--command-timeout seconds]
+                         [-s] [-w workers] [--spool directory]
+                         [--prompt-cache cachefile] [--prompt-ttl hours]
+                         [-i idletimeout] [-k keepalive]
+                         [--down-after failures] [--max-backoff seconds]
+                         [--telemetry] [--metrics-port port]
+                         [--profile cycles] [--profile-report reportfile]
+                         [--record directory] [--replay directory]
+                         [--shard K/N] [--shard-lease leasefile]
+                         [--shard-ttl seconds]
 
     Obtain metrics from a device via SSH; parse and format for InfluxDB
 
     options:
     -h, --help            show this help message and exit
     -d, --debug           Enables debug with copious console output, but none to InfluxDB
-    -p paramfile, --paramfile paramfile
-                            YAML file with inventory and parsing specs
+    -p paramfile [paramfile ...], --paramfile paramfile [paramfile ...]
+                            YAML file with inventory and parsing specs; several
+                            files, or directories of them, run as one collector
     -g group, --group group
                             Device group from optionsconfig.yaml (default of "device_inventory")
     -f frequency, --frequency frequency
                             Frequency (in seconds) to repeat collection (default of 300 seconds)
+    -t threads, --threads threads
+                            Deprecated - collection now runs on a single event loop
+    -c concurrency, --concurrency concurrency
+                            Maximum concurrent SSH sessions (default of 500)
+    --adaptive            Adapt the concurrent session limit to observed connect
+                            and command latency and timeouts, up to -c/--concurrency
+    --login-rate logins   Most new SSH logins per second across all devices
+                            (default of no limit)
+    --user-login-rate logins
+                            Most new SSH logins per second with any one username
+                            (default of no limit)
+    -m commandmode, --command-mode commandmode
+                            "paced" pauses 1 second after each command, "prompt" relies
+                            only on prompt detection (default of paced)
+    --pipeline depth        Commands written to a device at once in prompt mode (default of 1)
+    --command-timeout seconds
+                            Initial seconds to wait for the prompt after a command;
+                            adapts to each command in prompt mode (default of 5)
+    -s, --stream          Parse and write each device's output as soon as it is
+                            collected instead of at the end of the cycle
+    -w workers, --parse-workers workers
+                            Worker processes for parsing output; 0 parses in the
+                            collector process (default of 0)
+    --spool directory     Directory to spool writes InfluxDB could not accept,
+                            replayed when it recovers (default of no spooling)
+    --prompt-cache cachefile
+                            File to remember learned device prompts in; skips the
+                            prompt learning pass at startup (default of no cache)
+    --prompt-ttl hours    Hours a cached prompt is trusted (default of 168)
+    -i idletimeout, --idle-timeout idletimeout
+                            Seconds an unused SSH session stays open between polls;
+                            0 logs in fresh every poll (default of 3 polling intervals)
+    -k keepalive, --keepalive keepalive
+                            Seconds between SSH keepalives on open sessions (default of 30)
+    --down-after failures
+                            Consecutive failed polls before a device is taken out of
+                            polling and re-probed in the background (default of 3)
+    --max-backoff seconds
+                            Longest wait between re-probes of a down device
+                            (default of 3600)
+    --telemetry           Write collector timings and counts as the
+                            ssh2influx_internal measurement
+    --metrics-port port   Serve the latest collector timings on
+                            http://127.0.0.1:port/metrics; implies --telemetry
+    --profile cycles      Run this many polling cycles with each stage
+                            profiled, write a report and exit
+    --profile-report reportfile
+                            Profile report file (default of "ssh2influx-profile.txt")
+    --record directory    Save the raw output of every command to capture
+                            files in this directory
+    --replay directory    Parse output saved with --record instead of polling
+                            devices, report parse throughput and exit
+    --shard K/N           Poll only the devices that hash to shard K of N
+                            collectors (default of all devices)
+    --shard-lease leasefile
+                            SQLite file shared by the collectors of a --shard
+                            run; a collector whose lease expires has its devices
+                            taken over by the others (default of no leases)
+    --shard-ttl seconds   Seconds a shard lease lasts without a heartbeat
+                            (default of 60)
 
     Inputs/Reference files:
         parameters.yaml - (optional name) contains inventory, command,
@@ -52,10 +127,55 @@
         Packaging fixups for IMPACT24
     10  2023-0826
         Added per param file thread parameter
+    11  2026-1017
+        Replaced thread-per-device collection with a single long-lived
+        asyncio event loop bounded by a concurrency semaphore
+        Persistent SSH session pool reused across polling cycles
+        Prompt-driven command mode with adaptive timeouts and pipelining
+        Parsing specifications compiled once at startup
+        Streaming collect, parse and write pipeline (--stream)
+        Line protocol encoder with full escaping, typed fields and
+        collection timestamps
+        Batched, gzip compressed, keep-alive Influx writer with retries
+        Disk spool and background replay for failed Influx writes
+        Optional multi-process parsing (--parse-workers)
+        Configuration files parsed once and hot reloaded when changed
+        Persistent prompt cache; prompts learned or re-learned in the
+        collection session itself
+        Device health tracking; down devices leave the polling cycle and
+        are re-probed in the background with exponential backoff
+        Polls staggered across the interval by a stable per-device
+        offset, never overlapping for the same device
+        Optional per-command frequency and phase; commands due together
+        share one session
+        Optional SSH port per device; benchmark suite with simulated
+        devices in benchmarks/
+        Self-telemetry as the ssh2influx_internal measurement and an
+        optional metrics endpoint
+        Per-stage profiling mode (--profile); lazy debug logging on the
+        collection path
+        Optional per-parsespec change suppression with heartbeat, and
+        counter deltas and rates
+        Record raw command output (--record) and replay it through
+        parsing offline (--replay)
+        Table matchtype for large columnar output
+        Optional streaming parse of large multiple and table outputs
+        while they are read, with bounded memory per session
+        Several paramfiles, or directories of them, in one collector;
+        a device's commands from every paramfile share its session and
+        each Influx target has one writer
+        Inventory sharding across collectors by rendezvous hashing of
+        the host alias (--shard), with optional leases so surviving
+        collectors take over a stopped collector's devices
+        Optional per-device or per-paramfile exec channels; a device's
+        commands run in parallel channels on its one connection
+        Optional adaptive concurrency limit driven by connect and command
+        slowdowns and timeouts (--adaptive); token bucket login rate
+        limits, collector-wide and per username
 """
 
 # Credits:
-__version__ = '10'
+__version__ = '11'
 __author__ = 'Jason Davis - jadavis@cisco.com'
 __license__ = 'Cisco Sample Code License, Version 1.1 - ' \
     'https://developer.cisco.com/site/license/cisco-sample-code-license/'
@@ -63,24 +183,122 @@ __license__ = 'Cisco Sample Code License, Version 1.1 - ' \
 
 import asyncio
 import asyncssh
+import contextlib
+import copy
+import functools
+import itertools
 import sys
 import time
-import yaml
-import re
 import argparse
 import os
-import pprint
 import datetime
-import schedule
+import queue
 import threading
+from common import changeFilter
+from common import deviceHealth
 from common import getEnv
-import requests
-from concurrent.futures import ThreadPoolExecutor
-from concurrent.futures import as_completed
+from common import influxWriter
+from common import loadControl
+from common import lineProtocol
+from common import outputCapture
+from common import parseSpecs
+from common import parseWorkers
+from common import pollScheduler
+from common import promptCache
+from common import selfTelemetry
+from common import sessionPool
+from common import shardMap
+from common import stageProfiler
+from common import writeSpool
 import logging
 
 # Global vars
 #MAX_THREADS = 10  # Number of threads to run in parallel - adjust to suit
+COMMAND_MODE = 'paced'  # 'paced' waits 1 sec per command, 'prompt' does not
+PIPELINE_DEPTH = 1      # Commands written per batch in 'prompt' mode
+COMMAND_TIMEOUT = 5     # Seconds to wait for a prompt before learning better
+PROMPT_DELIMS = ('#', '$', '>')  # Characters a device prompt ends with
+PROMPTS = None          # PromptCache of learned prompts (--prompt-cache)
+STREAM = False          # Parse and write each device as soon as it finishes
+STREAM_QUEUE_SIZE = 1000  # Devices' parsed output waiting for the writer
+STREAM_BATCH = 500      # Most devices' output sent in one streamed write
+ENCODER = lineProtocol.LineProtocolEncoder(precision='s')
+WRITERS = {}            # InfluxWriter per Influx server alias
+WRITERS_LOCK = threading.Lock()
+SPOOL_DIR = None        # Directory for writes InfluxDB did not accept
+SPOOLS = {}             # WriteSpool per Influx server alias
+WRITE_QUEUE = None      # Scheduled polls' line protocol for the writer thread
+WRITE_QUEUE_SIZE = 16   # Polls' writes waiting before they go to the spool
+PARSER = None           # ParsePool when parsing in worker processes
+CONFIG_STAMPS = None    # Modification stamps of the loaded config files
+RELEARN_PENDING = False  # Devices were busy when their login changed
+DOWN_AFTER = 3          # Consecutive failures before a device is down
+PROBE_BACKOFF = 30      # Seconds before the first re-probe of a down device
+MAX_BACKOFF = 3600      # Longest wait between re-probes
+PROBE_INTERVAL = 5      # Seconds between checks for down devices to probe
+TICK = 1.0              # Seconds between checks for devices due a poll
+TELEMETRY = None        # SelfTelemetry when --telemetry is in use
+CHANGES = None          # ChangeFilter for parsespec write policies
+RECORDER = None         # CaptureWriter when --record is in use
+REPLAY_BATCH = 200      # Recorded device polls parsed together in --replay
+PARSE_SPECS = None      # Compiled parsespecs, for output parsed as it is read
+STREAM_CHUNK = 65536    # Most characters read at once from streamed output
+ROUTES = {}             # Influx target by parsespec, with several paramfiles
+LOGIN_KEYS = ('host', 'port', 'username', 'password')
+CONGESTION_ERRORS = (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                     asyncssh.ConnectionLost, ConnectionResetError)
+SHARD = None           # ShardMap when this is one of several collectors
+LEASE = None           # ShardLease in the store shared with the others
+LIMITER = None         # AdaptiveLimit when concurrency adapts (--adaptive)
+LOGINS = None          # LoginLimiter when logins are rate limited
+
+
+class CommandTimer:
+    # Adaptive prompt timeouts for one device.  Keeps a moving average
+    # of how long each command takes to return to the prompt and waits
+    # a few multiples of that; a command that times out gets double the
+    # wait on its next run, up to the maximum
+    def __init__(self, base=5, maximum=120, factor=3, alpha=0.3):
+        self.base = base
+        self.maximum = maximum
+        self.factor = factor
+        self.alpha = alpha
+        self.average = {}
+        self.override = {}
+
+    def timeout(self, command):
+        if command in self.override:
+            return self.override[command]
+        average = self.average.get(command)
+        if average is None:
+            return self.base
+        return min(max(self.base, self.factor * average), self.maximum)
+
+    def observe(self, command, elapsed):
+        self.override.pop(command, None)
+        average = self.average.get(command)
+        if average is None:
+            self.average[command] = elapsed
+        else:
+            self.average[command] = (self.alpha * elapsed +
+                                     (1 - self.alpha) * average)
+
+    def expired(self, command):
+        self.override[command] = min(2 * self.timeout(command),
+                                     self.maximum)
+
+def static_prompt(server_version):
+    # Prompt for endpoints we do not learn interactively, or None when
+    # the prompt has to be learned from the device
+    if 'Cisco' in server_version or 'PKIX' in server_version or \
+        'SSH-2.0-OpenSSH' in server_version:
+        return None
+    elif 'Ubuntu' in server_version:
+        # OK - we got an Ubuntu endpoint
+        return ':~$'
+    else:
+        # OK - something else, assume a simple $ ending prompt
+        return '$'
 
 
 class SSHTarget:
@@ -90,24 +308,46 @@ class SSHTarget:
     def __init__(self, info):
         self.alias = info["hostalias"]
         self.mgmt = info["host"]
+        self.port = info.get("port", 22)
         self.reachable = None
         self.username = info["username"]
         self.password = info["password"]
         self.commands = info["commands"]
-        #if DEBUG: print(f'\n\n=====Learning device: {self.alias}')
-        logging.debug(f'=====Learning device: {self.alias}')
-        presult = self.get_prompt(self.mgmt, self.username, self.password)
+        self.channels = info.get("channels", 1)  # Exec channels at once
+        self.server_version, self.prompt = ('Undefined', 'Undefined')
+        self.timer = CommandTimer(base=COMMAND_TIMEOUT)
+        self.usual = {}         # Usual connect and command times
+        self.busy = False       # A scheduled poll is in progress
+        self.due = None         # Commands due in that poll (None for all)
+        self.started = None     # When the latest poll got its session slot
+        self.sink = None        # Coroutine given streamed output's points
+        self.health = deviceHealth.DeviceHealth(down_after=DOWN_AFTER,
+                                                base_backoff=PROBE_BACKOFF,
+                                                max_backoff=MAX_BACKOFF)
+
+    async def learn(self, semaphore):
+        # Connect once to learn the device prompt and SSH server type;
+        # runs on the shared collector event loop like all other sessions
+        logging.debug('=====Learning device: %s', self.alias)
+        async with semaphore:
+            presult = await self.get_prompt(self.mgmt, self.username,
+                                            self.password)
         if presult == 'Failed':
             self.server_version, self.prompt = ('Undefined', 'Undefined')
             self.reachable = False
+            # Leave it to the background prober rather than the polls
+            self.health.mark_down()
         else:
             self.server_version, self.prompt = presult[0], presult[1]
             self.reachable = True
-        #print(self.server_version, self.prompt)
+            if PROMPTS is not None:
+                PROMPTS.put(self.alias, self.mgmt, self.server_version,
+                            self.prompt)
         if self.reachable:
             print(f'{self.alias} initialized')
-            logging.debug(f'prompt is [{self.prompt}]\n'
-                          f'SSH server type is [{self.server_version}]')
+            logging.debug('prompt is [%s]\nSSH server type is [%s]',
+                          self.prompt, self.server_version)
+        return self
 
 
     def __str__(self):
@@ -117,7 +357,10 @@ class SSHTarget:
         print("exited")
 
     async def _get_prompt(self, device, username, password):
-        async with asyncssh.connect(device, username=username,
+        if LOGINS is not None:
+            await LOGINS.wait(username)
+        async with asyncssh.connect(device, port=self.port,
+                                    username=username,
                                     password=password,
                                     client_keys=None,
                                     known_hosts=None,
@@ -126,16 +369,16 @@ class SSHTarget:
             #if DEBUG: print(f'DEBUG: Socket connection info:\n'
             #                f'{conn.get_extra_info("socket")}'
             #                f'\nserver version: {server_version}')
-            logging.debug(f'DEBUG: Socket connection info:\n'
-                          f'{conn.get_extra_info("socket")}\n'
-                          f'server version: {server_version}')
+            logging.debug('DEBUG: Socket connection info:\n%s\n'
+                          'server version: %s',
+                          conn.get_extra_info("socket"), server_version)
             
-            if 'Cisco' in server_version or 'PKIX' in server_version or \
-                'SSH-2.0-OpenSSH' in server_version:
+            prompt = static_prompt(server_version)
+            if prompt is None:
                 # Yeah - got a Cisco device
                 # Initial list of common prompt delimiters/separators;
                 # we use generic ones until we learn the device-specific
-                delims = ('#', '$', '>')
+                delims = PROMPT_DELIMS
                 result = ''
                 async with conn.create_process(term_type="vt100") as process:
                     #process.stdin.write('!test\n\n')
@@ -149,109 +392,629 @@ class SSHTarget:
                     NEWLINE = '\n'
                     prompt = result.strip().split(NEWLINE)[-1].strip()
                     return server_version, prompt
-            elif 'Ubuntu' in server_version:
-                # OK - we got an Ubuntu endpoint
-                return server_version, ':~$'
-            else:
-                # OK - something else, assume a simple $ ending prompt
-                return server_version, '$'
+            return server_version, prompt
 
-    def get_prompt(self, device, username, password):
+    async def get_prompt(self, device, username, password):
         #if DEBUG: print('Starting get_prompt')
         logging.debug('Starting get_prompt')
         try:
-            return asyncio.run(self._get_prompt(device, username,
-                                                password))
+            return await self._get_prompt(device, username, password)
         except (OSError, asyncssh.Error) as exc:
             print(f'SSH connection failed in get_prompt to {device}')
             #sys.exit('SSH connection failed: ' + str(exc))
             return ('Failed')
 
-    async def _run_command(self):
-        async with asyncssh.connect(self.mgmt, username=self.username,
-                                    password=self.password,
-                                    client_keys=None,
-                                    known_hosts=None,
-                                    connect_timeout=10) as conn:
+    async def _read_quiet(self, process, quiet=0.5, timeout=10):
+        # Read until the device goes quiet with a prompt delimiter at the
+        # end of the text; used while the prompt is not known
+        text = ''
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                chunk = await asyncio.wait_for(process.stdout.read(4096),
+                                               timeout=quiet)
+            except asyncio.TimeoutError:
+                if text.rstrip().endswith(PROMPT_DELIMS):
+                    break
+                continue
+            if not chunk:
+                break
+            text += chunk
+        return text
+
+    async def _learn_in_session(self, conn, process):
+        # Learn the prompt and server version from an open session
+        # instead of a separate login, and remember them
+        server_version = conn.get_extra_info(name='server_version')
+        prompt = static_prompt(server_version)
+        if prompt is not None:
+            # Read past the login banner and first prompt, as a session
+            # with a known prompt does, so the first command's output
+            # starts after them
+            try:
+                result = await asyncio.wait_for(
+                    process.stdout.readuntil(prompt),
+                    timeout=COMMAND_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise asyncssh.Error(asyncssh.DISC_PROTOCOL_ERROR,
+                                     f'prompt <{prompt}> not seen on '
+                                     f'{self.alias}')
+        else:
+            result = await self._read_quiet(process)
+            if not result.rstrip().endswith(PROMPT_DELIMS):
+                process.stdin.write('\n')
+                result += await self._read_quiet(process)
+            NEWLINE = '\n'
+            prompt = result.strip().split(NEWLINE)[-1].strip()
+        logging.debug('Login session header/output: [%s]', result)
+        if not prompt.endswith(PROMPT_DELIMS):
+            raise asyncssh.Error(asyncssh.DISC_PROTOCOL_ERROR,
+                                 f'no prompt found on {self.alias}')
+        self.server_version, self.prompt = server_version, prompt
+        self.reachable = True
+        print(f'{self.alias} learned prompt <{self.prompt}>')
+        if PROMPTS is not None:
+            PROMPTS.put(self.alias, self.mgmt, server_version, prompt)
+
+    async def _open_session(self, keepalive_interval=0,
+                            keepalive_count_max=3):
+        # Log in, start the interactive shell and prepare it for command
+        # collection; returns the connection and shell process
+        if LOGINS is not None:
+            await LOGINS.wait(self.username)
+        began = time.monotonic()
+        conn = await asyncssh.connect(self.mgmt, port=self.port,
+                                      username=self.username,
+                                      password=self.password,
+                                      client_keys=None,
+                                      known_hosts=None,
+                                      connect_timeout=10,
+                                      keepalive_interval=keepalive_interval,
+                                      keepalive_count_max=keepalive_count_max)
+        try:
             print(f'Connection made to {self.alias} / '
                   f'{conn.get_extra_info("peername")[0]}:'
                   f'{conn.get_extra_info("peername")[1]} with prompt '
                   f'<{self.prompt}>')
             process = await conn.create_process(request_pty='force',
                                                 term_type="vt100")
+            if self.prompt in (None, 'Undefined'):
+                # Not learned yet - learn it from this session's banner
+                await self._learn_in_session(conn, process)
+            else:
+                result = ''
+                try:
+                    result += await asyncio.wait_for(
+                                process.stdout.readuntil(self.prompt),
+                                timeout=5)
+                except asyncio.TimeoutError:
+                    # The prompt has changed (new hostname, context...)
+                    print(f'Prompt <{self.prompt}> not seen on '
+                          f'{self.alias} - learning it again')
+                    process.stdin.write('\n')
+                    try:
+                        await self._learn_in_session(conn, process)
+                    except Exception:
+                        # The old prompt is wrong too - learn from scratch
+                        # at the next login, and after a restart
+                        self.prompt = None
+                        if PROMPTS is not None:
+                            PROMPTS.forget(self.alias, self.mgmt)
+                        raise
+                #print(f'Login session header/output: [{result}]')
+                logging.debug('Login session header/output: [%s]', result)
+        except BaseException:
+            conn.close()
+            raise
+        if 'Cisco' in self.server_version or 'PKIX' in self.server_version:
+            # Prep env with 'term len 0'
+            command = 'terminal length 0'
+            logging.debug('Working setup command - [%s]', command)
+            process.stdin.write(command + '\n')
+            logging.debug('Sent - [%s]', command)
+            logging.debug('Waiting for prompt [%s] for %s', self.prompt,
+                          self.alias)
+            if COMMAND_MODE == 'paced':
+                await asyncio.sleep(1)
             result = ''
             try:
                 result += await asyncio.wait_for(
-                            process.stdout.readuntil(self.prompt),
-                            timeout=5)
+                    process.stdout.readuntil(self.prompt),
+                    timeout=5)
             except Exception as e:
-                print(f'Prompt timeout for header with error:\n    {e}')
-            #print(f'Login session header/output: [{result}]')
-            logging.debug(f'Login session header/output: [{result}]')
-            if 'Cisco' in self.server_version or 'PKIX' in self.server_version:
-                # Prep env with 'term len 0'
-                command = 'terminal length 0'
-                logging.debug(f'Working setup command - [{command}]')
-                process.stdin.write(command + '\n')
-                logging.debug(f'Sent - [{command}]')
-                logging.debug(f'Waiting for prompt [{self.prompt}] for {self.alias}')
-                time.sleep(1)
-                result = ''
-                try:
-                    result += await asyncio.wait_for(
-                        process.stdout.readuntil(self.prompt),
-                        timeout=5)
-                except Exception as e:
-                    print(f'prompt timeout step {e}')
+                print(f'prompt timeout step {e}')
+                self._prompt_timeout()
 
-                #print(f'tl0 command [{command}] output:\n[{result}]')
+            #print(f'tl0 command [{command}] output:\n[{result}]')
 
-                logging.debug(f'tl0 command [{command}] output:\n[{result}]')
-                result = ''
-                #print('COMPLETE TERM LEN 0 injection')
-            
-            # Start specific command collection
-            output_records = []
-            logging.debug(f'Commands to execute are:\n{self.commands}')
-            for item in self.commands:
+            logging.debug('tl0 command [%s] output:\n[%s]', command, result)
+            result = ''
+            #print('COMPLETE TERM LEN 0 injection')
+        if TELEMETRY is not None:
+            TELEMETRY.connected(self.alias, time.monotonic() - began)
+        self._observed(None, time.monotonic() - began)
+        return conn, process
+
+    async def _collect(self, conn, process):
+        # Run the due commands over exec channels when the device allows
+        # several at once, otherwise through the prepared shell
+        if self.channels > 1:
+            return await self._send_commands_exec(conn, process)
+        return await self._send_commands(process)
+
+    async def _send_commands(self, process, commands=None):
+        # Run the job commands through a prepared shell; returns the
+        # output records and whether every command returned to the prompt
+        if commands is None:
+            commands = self.commands if self.due is None else self.due
+        if COMMAND_MODE == 'prompt':
+            return await self._send_commands_prompt(process, commands)
+        output_records = []
+        clean = True
+        logging.debug('Commands to execute are:\n%s', commands)
+        for item in commands:
+            command = item['cmd']
+            parsespec = item['parsespec']
+            #if DEBUG: print(f'DEBUG: Working command - <{command}> '
+            #                f'and parsespec <{parsespec}>')
+            logging.debug('Working job command - <%s> and parsespec <%s>',
+                          command, parsespec)
+            began = time.monotonic()
+            process.stdin.write(command + "\n")
+            await asyncio.sleep(1)
+            #await asyncio.wait_for(process.stdout.readuntil(self.prompt),
+            #                       timeout=10)
+            #process.stdin.write("\n")
+            #result = ''
+            result = ''
+            streaming = self._streaming_spec(parsespec)
+            try:
+                if streaming is None:
+                    result += await asyncio.wait_for(
+                                process.stdout.readuntil(self.prompt),
+                                timeout=COMMAND_TIMEOUT)
+                else:
+                    result = await self._read_streamed(process, streaming,
+                                                       COMMAND_TIMEOUT)
+            except Exception as e:
+                print(f'prompt timeout with error:\n   {e}')
+                clean = False
+                self._prompt_timeout()
+            else:
+                self._observed(command, time.monotonic() - began)
+            if TELEMETRY is not None:
+                TELEMETRY.command(self.alias, command,
+                                  time.monotonic() - began, len(result))
+
+            #if DEBUG: print(f'Command specific [{command}] output:\n[{result}]')
+            #print(f'Command specific [{command}] output:\n[{result}]')
+            logging.debug('Command specific [%s] output:\n[%s]', command, result)
+            output_records.append((self.alias, command, parsespec,
+                                   result))
+            for also in item.get('also', ()):
+                output_records.append((self.alias, command, also, result))
+        return output_records, clean
+
+    async def _send_commands_prompt(self, process, commands):
+        # Prompt-driven collection with no fixed pauses - each command's
+        # output ends at the next prompt.  Commands are written
+        # PIPELINE_DEPTH at a time and the replies split on the prompts
+        output_records = []
+        logging.debug('Commands to execute are:\n%s', commands)
+        depth = max(PIPELINE_DEPTH, 1)
+        for batch in self._batches(commands, depth):
+            process.stdin.write(''.join(item['cmd'] + '\n'
+                                        for item in batch))
+            began = time.monotonic()
+            for item in batch:
                 command = item['cmd']
                 parsespec = item['parsespec']
-                #if DEBUG: print(f'DEBUG: Working command - <{command}> '
-                #                f'and parsespec <{parsespec}>')
-                logging.debug(f'Working job command - <{command}> '
-                                f'and parsespec <{parsespec}>')
-                process.stdin.write(command + "\n")
-                time.sleep(1)
-                #await asyncio.wait_for(process.stdout.readuntil(self.prompt),
-                #                       timeout=10)
-                #process.stdin.write("\n")
-                #result = ''
-                result = ''
+                timeout = self.timer.timeout(command)
+                streaming = self._streaming_spec(parsespec)
                 try:
-                    result += await asyncio.wait_for(
-                                process.stdout.readuntil(self.prompt),
-                                timeout=5)
-                except Exception as e:
-                    print(f'prompt timeout with error:\n   {e}')
-
-                #if DEBUG: print(f'Command specific [{command}] output:\n[{result}]')
-                #print(f'Command specific [{command}] output:\n[{result}]')
-                logging.debug(f'Command specific [{command}] output:\n[{result}]')
+                    if streaming is None:
+                        result = await asyncio.wait_for(
+                                    process.stdout.readuntil(self.prompt),
+                                    timeout=timeout)
+                    else:
+                        result = await self._read_streamed(process,
+                                                           streaming,
+                                                           timeout)
+                except (asyncio.TimeoutError,
+                        asyncio.IncompleteReadError) as e:
+                    print(f'prompt timeout after {timeout:.1f}s for '
+                          f'[{command}] on {self.alias}: {e!r}')
+                    self.timer.expired(command)
+                    self._prompt_timeout()
+                    # Later replies in the shell can no longer be lined
+                    # up with their commands
+                    return output_records, False
+                finished = time.monotonic()
+                self.timer.observe(command, finished - began)
+                self._observed(command, finished - began)
+                if TELEMETRY is not None:
+                    TELEMETRY.command(self.alias, command, finished - began,
+                                      len(result))
+                began = finished
+                logging.debug('Command specific [%s] output:\n[%s]', command, result)
                 output_records.append((self.alias, command, parsespec,
                                        result))
-            conn.close()
+                for also in item.get('also', ()):
+                    output_records.append((self.alias, command, also,
+                                           result))
+        return output_records, True
+
+    async def _send_commands_exec(self, conn, process):
+        # Run each command in its own exec channel on the connection, up
+        # to self.channels at once, so the poll takes about as long as
+        # its slowest command.  Output ends when the channel closes - no
+        # prompt, pacing or pipelining.  Commands the device would not
+        # open a channel for go through the shell afterwards, and the
+        # device's channel limit is halved for later polls
+        commands = self.commands if self.due is None else self.due
+        logging.debug('Commands to execute over %d channels are:\n%s',
+                      self.channels, commands)
+        limit = asyncio.Semaphore(self.channels)
+        results = await asyncio.gather(*(self._exec_command(conn, item,
+                                                            limit)
+                                         for item in commands))
+        output_records = []
+        refused = []
+        for item, records in zip(commands, results):
+            if records is None:
+                refused.append(item)
+            else:
+                output_records.extend(records)
+        clean = True
+        if refused:
+            self.channels = max(self.channels // 2, 1)
+            print(f'{self.alias} refused {len(refused)} exec channels - '
+                  f'sending them through the shell and using up to '
+                  f'{self.channels} channels from now on')
+            shell_records, clean = await self._send_commands(process,
+                                                             refused)
+            output_records.extend(shell_records)
+        return output_records, clean
+
+    async def _exec_command(self, conn, item, limit):
+        # One command in its own exec channel; returns its output records,
+        # or None when the device would not open the channel.  A command
+        # that times out is closed with its channel and gives empty output
+        command = item['cmd']
+        parsespec = item['parsespec']
+        timeout = self.timer.timeout(command)
+        streaming = self._streaming_spec(parsespec)
+        async with limit:
+            began = time.monotonic()
+            try:
+                async with conn.create_process(command) as process:
+                    if streaming is None:
+                        result = await asyncio.wait_for(
+                            process.stdout.read(), timeout=timeout)
+                    else:
+                        result = await self._read_streamed(
+                            process, streaming, timeout, prompt=False)
+            except asyncssh.ChannelOpenError as e:
+                logging.debug('Exec channel for [%s] refused by %s: %r',
+                              command, self.alias, e)
+                return None
+            except asyncio.TimeoutError as e:
+                print(f'exec channel timeout after {timeout:.1f}s for '
+                      f'[{command}] on {self.alias}: {e!r}')
+                self.timer.expired(command)
+                self._prompt_timeout()
+                result = ''
+            else:
+                self.timer.observe(command, time.monotonic() - began)
+                self._observed(command, time.monotonic() - began)
+        if TELEMETRY is not None:
+            TELEMETRY.command(self.alias, command, time.monotonic() - began,
+                              len(result))
+        logging.debug('Command specific [%s] output:\n[%s]', command, result)
+        return [(self.alias, command, spec, result)
+                for spec in (parsespec, *item.get('also', ()))]
+
+    def _streaming_spec(self, parsespec):
+        # The compiled spec when a command's output is parsed as it is
+        # read, otherwise None
+        if PARSE_SPECS is None:
+            return None
+        spec = PARSE_SPECS.get(parsespec)
+        if spec is None or not spec.streaming:
+            return None
+        return spec
+
+    def _batches(self, commands, depth):
+        # Commands written to the shell together, up to depth at a time.
+        # A streamed command ends its batch - its output is read in
+        # chunks up to the prompt, so nothing may follow that prompt
+        batch = []
+        for item in commands:
+            batch.append(item)
+            if (len(batch) >= depth or
+                    self._streaming_spec(item['parsespec']) is not None):
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def _read_streamed(self, process, parsespec, timeout, prompt=True):
+        # Read a command's output in chunks up to the prompt, or to the
+        # end of an exec channel's output, parsing each block of complete
+        # lines as it arrives so a large output is never held whole (see
+        # common/parseSpecs.py).  timeout is the longest wait for more
+        # output, not for all of it
+        # With --record the text is kept as well, to be saved with the poll
+        stream = parsespec.stream(self.alias, keep=RECORDER is not None)
+        began = time.time()
+        tail = ''
+        while True:
+            chunk = await asyncio.wait_for(
+                process.stdout.read(STREAM_CHUNK), timeout=timeout)
+            if not chunk and prompt:
+                raise asyncio.IncompleteReadError(tail, None)
+            if not chunk:
+                if self.sink is not None:
+                    stream.feed(tail)
+                    await self.sink(parsespec.id, stream.take(), began)
+                    tail = ''
+                return stream.close(tail)
+            text = tail + chunk
+            # Earlier text was already searched for the prompt
+            found = text.find(self.prompt,
+                              max(len(tail) - len(self.prompt) + 1, 0))
+            if found >= 0:
+                end = found + len(self.prompt)
+                if text[end:]:
+                    logging.debug('Discarded [%s] after the prompt on %s',
+                                  text[end:], self.alias)
+                stream.feed(text[:end])
+                if self.sink is not None:
+                    await self.sink(parsespec.id, stream.take(), began)
+                return stream.close()
+            cut = text.rfind('\n') + 1
+            if cut:
+                stream.feed(text[:cut])
+                if self.sink is not None:
+                    # Waits while the writer's queue is full, which in
+                    # turn stops the device sending more for now
+                    await self.sink(parsespec.id, stream.take(), began)
+            tail = text[cut:]
+
+    def opener(self, pool):
+        # Session opener with the pool's keepalive settings
+        return functools.partial(self._open_session,
+                                 pool.keepalive_interval,
+                                 pool.keepalive_count_max)
+
+    async def _run_command(self, pool=None):
+        if pool is None:
+            # One-shot session - log in, collect and log out
+            conn, process = await self._open_session()
+            async with conn:
+                output_records, _ = await self._collect(conn, process)
             return output_records
 
-    def run_commands(self):
+        # Reuse the pooled session; a session that dropped since the
+        # last cycle (or drops mid-cycle) is re-opened once, transparently
+        opener = self.opener(pool)
+        for attempt in (1, 2):
+            session = await pool.acquire(self.alias, opener)
+            async with session.lock:
+                logging.debug('Using pooled session to %s', self.alias)
+                output_records, clean = \
+                    await self._collect(session.conn, session.process)
+                session.touch()
+            if session.is_alive() and clean:
+                return output_records
+            # Stale output may still be in flight after a prompt timeout,
+            # so never hand that shell to the next cycle
+            pool.discard(self.alias)
+            if session.is_alive():
+                return output_records
+            print(f'Session to {self.alias} dropped - reconnecting')
+        return output_records
+
+    async def run_commands(self, semaphore, pool=None):
         #if DEBUG: print(f'    =Collecting commands for device: {self.alias}')
-        logging.debug(f'    =Collecting commands for device: {self.alias}')
+        logging.debug('    =Collecting commands for device: %s', self.alias)
 
         try:
-            return asyncio.run(self._run_command())
+            async with semaphore:
+                self.started = time.time()
+                output_records = await self._run_command(pool)
         except Exception as exc:
             print(f'ALERT - Got an exception - [{exc}]')
             print(f'SSH connection failed in run_commands to '
                      f'{self.alias}: ' + str(exc))
+            # Only timeouts and dropped connections say collection may be
+            # overloading the network - not bad credentials or host keys,
+            # and not failed re-probes of down devices
+            if LIMITER is not None and isinstance(exc, CONGESTION_ERRORS):
+                LIMITER.timed_out()
+            self._failed()
+            return None
+        self._recovered()
+        if RECORDER is not None and output_records:
+            # Streamed output is recorded as the text it was parsed from
+            RECORDER.record([record if isinstance(record[3], str)
+                             else (*record[:3], record[3].text)
+                             for record in output_records])
+        return output_records
+
+    async def probe(self, semaphore, pool=None):
+        # Background re-probe of a down device - log in (learning the
+        # prompt if it is still unknown) and, with pooling, keep the
+        # session for the device's first poll back
+        logging.debug('Probing down device %s', self.alias)
+        try:
+            async with semaphore:
+                if pool is None:
+                    conn, _ = await self._open_session()
+                    conn.close()
+                else:
+                    await pool.acquire(self.alias, self.opener(pool))
+        except Exception as exc:
+            logging.debug('Probe of %s failed: %r', self.alias, exc)
+            self._failed()
+        else:
+            self._recovered()
+        finally:
+            self.health.probing = False
+
+    def _observed(self, key, seconds):
+        # Tell the adaptive concurrency limit how a connect (key None)
+        # or command compared with its usual time on this device.  The
+        # usual time drops straight to a faster run but rises slowly,
+        # so a slowdown shows for several polls
+        if LIMITER is None:
+            return
+        usual = self.usual.get(key)
+        if usual is None or seconds < usual:
+            self.usual[key] = seconds
+        else:
+            self.usual[key] = usual + 0.1 * (seconds - usual)
+        LIMITER.observe(seconds / usual if usual else 1.0)
+
+    def _prompt_timeout(self):
+        if TELEMETRY is not None:
+            TELEMETRY.prompt_timeout(self.alias)
+        if LIMITER is not None:
+            LIMITER.timed_out()
+
+    def _failed(self):
+        if self.health.failure() == deviceHealth.DOWN:
+            self.reachable = False
+            print(f'{self.alias} is down after {self.health.failures} '
+                  f'failures - next probe in '
+                  f'{self.health.retry_in():.0f} seconds')
+
+    def _recovered(self):
+        if self.health.success() == deviceHealth.DOWN:
+            print(f'{self.alias} recovered - back in the polling cycle')
+        self.reachable = True
+
+
+class CollectorLoop:
+    # One long-lived asyncio event loop, run in a background thread, that
+    # drives every device session for the life of the process.  Polling
+    # cycles hand their coroutines to the loop with run(); the semaphore
+    # (or, with adaptive concurrency, an AdaptiveLimit up to the same
+    # ceiling) bounds how many devices are being collected at the same
+    # time and the session pool keeps logged-in shells open between
+    # cycles.  Logins are paced when login rates are given
+    def __init__(self, concurrency, idle_timeout=900, keepalive=30,
+                 adaptive=False, login_rate=None, user_login_rate=None):
+        self.concurrency = concurrency
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever,
+                                       name='CollectorLoop', daemon=True)
+        self.thread.start()
+        self._evictor = None
+        self._prober = None
+        self.semaphore, self.probe_semaphore, self.sessions = self.run(
+            self._setup(idle_timeout, keepalive, adaptive))
+        self.logins = None
+        if login_rate or user_login_rate:
+            self.logins = self.run(self._login_limiter(login_rate,
+                                                       user_login_rate))
+
+    async def _login_limiter(self, login_rate, user_login_rate):
+        return loadControl.LoginLimiter(login_rate, user_login_rate)
+
+    async def _setup(self, idle_timeout, keepalive, adaptive=False):
+        # Created on the loop itself so they bind to the right loop.
+        # Re-probes of down devices get their own small allowance so they
+        # never hold the slots the polling cycle needs
+        if adaptive:
+            semaphore = loadControl.AdaptiveLimit(self.concurrency)
+        else:
+            semaphore = asyncio.Semaphore(self.concurrency)
+        probe_semaphore = asyncio.Semaphore(max(self.concurrency // 10, 1))
+        if not idle_timeout:
+            return semaphore, probe_semaphore, None
+        sessions = sessionPool.SessionPool(idle_timeout=idle_timeout,
+                                           keepalive_interval=keepalive)
+        self._evictor = self.loop.create_task(sessions.run_evictor())
+        return semaphore, probe_semaphore, sessions
+
+    def run(self, coro):
+        # Submit a coroutine to the collector loop and wait for its result
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def watch(self, inventory):
+        # Start re-probing down devices in the background
+        self._prober = self.run(self._watch(inventory))
+
+    async def _watch(self, inventory):
+        return asyncio.ensure_future(
+            probe_down(inventory, self.probe_semaphore, self.sessions))
+
+    async def _shutdown(self):
+        # Cancel the background tasks and wait for them to wind down, so
+        # none is left pending when the loop stops
+        tasks = [task for task in (self._evictor, self._prober)
+                 if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.sessions is not None:
+            self.sessions.close_all()
+
+    def stop(self):
+        try:
+            asyncio.run_coroutine_threadsafe(
+                self._shutdown(), self.loop).result(timeout=10)
+        except Exception as exc:
+            logging.debug('Collector loop shutdown incomplete: %r', exc)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+async def learn_all(targets, semaphore):
+    # Learn prompts for all devices concurrently
+    return await asyncio.gather(*(target.learn(semaphore)
+                                  for target in targets))
+
+
+async def probe_down(inventory, semaphore, pool=None):
+    # Runs for the life of the process - start a probe for every down
+    # device whose backoff has expired.  The inventory is the live one
+    # that configuration reloads update
+    probes = set()
+    try:
+        while True:
+            for target in list(inventory.values()):
+                if target.health.probe_due():
+                    target.health.probing = True
+                    task = asyncio.ensure_future(target.probe(semaphore,
+                                                              pool))
+                    probes.add(task)
+                    task.add_done_callback(probes.discard)
+            await asyncio.sleep(PROBE_INTERVAL)
+    finally:
+        # Stopped with the collector - take the probes still running along
+        for task in list(probes):
+            task.cancel()
+        await asyncio.gather(*probes, return_exceptions=True)
+
+
+async def connect_all(targets, semaphore, pool):
+    # Open, or check, every device's pooled session ahead of collection
+    async def connect(target):
+        try:
+            async with semaphore:
+                await pool.acquire(target.alias, target.opener(pool))
+        except Exception as exc:
+            print(f'Connection to {target.alias} failed: {exc!r}')
+    await asyncio.gather(*(connect(target) for target in targets))
+
+
+async def collect_all(targets, semaphore, pool=None):
+    # Collect command output from all devices concurrently; devices
+    # whose session failed return None and are left out of the results
+    results = await asyncio.gather(*(target.run_commands(semaphore, pool)
+                                     for target in targets))
+    return [result for result in results if result is not None]
 
 
 def get_arguments():
@@ -268,7 +1031,11 @@ def get_arguments():
                         'output, but none to InfluxDB')
     parser.add_argument('-p', '--paramfile', metavar='paramfile',
                         required=True,
-                        help='YAML file with inventory and parsing specs')
+                        nargs='+',
+                        action='extend',
+                        help='YAML file with inventory and parsing specs; '
+                             'several files, or directories of them, run '
+                             'as one collector')
     parser.add_argument('-g', '--group', metavar='group',
                         default="device_inventory",
                         help=('Device group from optionsconfig.yaml '
@@ -281,23 +1048,193 @@ def get_arguments():
     parser.add_argument('-t', '--threads', metavar='threads',
                         default=1,
                         type=int,
-                        help='Thread count to use with collection '
-                             '(default of 1)')
+                        help='Deprecated - collection now runs on a '
+                             'single event loop, see --concurrency')
+    parser.add_argument('-c', '--concurrency', metavar='concurrency',
+                        default=500,
+                        type=int,
+                        help='Maximum concurrent SSH sessions '
+                             '(default of 500)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Adapt the concurrent session limit to '
+                             'observed connect and command latency and '
+                             'timeouts, up to -c/--concurrency')
+    parser.add_argument('--login-rate', metavar='logins',
+                        default=None,
+                        type=float,
+                        dest='login_rate',
+                        help='Most new SSH logins per second across all '
+                             'devices (default of no limit)')
+    parser.add_argument('--user-login-rate', metavar='logins',
+                        default=None,
+                        type=float,
+                        dest='user_login_rate',
+                        help='Most new SSH logins per second with any one '
+                             'username (default of no limit)')
+    parser.add_argument('-m', '--command-mode', metavar='commandmode',
+                        default='paced',
+                        choices=['paced', 'prompt'],
+                        dest='command_mode',
+                        help='"paced" pauses 1 second after each command, '
+                             '"prompt" relies only on prompt detection '
+                             '(default of paced)')
+    parser.add_argument('--pipeline', metavar='depth',
+                        default=1,
+                        type=int,
+                        help='Commands written to a device at once in '
+                             'prompt mode (default of 1)')
+    parser.add_argument('--command-timeout', metavar='seconds',
+                        default=5,
+                        type=float,
+                        dest='command_timeout',
+                        help='Initial seconds to wait for the prompt after '
+                             'a command; adapts to each command in prompt '
+                             'mode (default of 5)')
+    parser.add_argument('-s', '--stream', action='store_true',
+                        default=False,
+                        help='Parse and write each device\'s output as '
+                             'soon as it is collected instead of at the '
+                             'end of the cycle')
+    parser.add_argument('-w', '--parse-workers', metavar='workers',
+                        default=0,
+                        type=int,
+                        dest='parse_workers',
+                        help='Worker processes for parsing output; 0 '
+                             'parses in the collector process (default '
+                             'of 0)')
+    parser.add_argument('--spool', metavar='directory',
+                        default=None,
+                        help='Directory to spool writes InfluxDB could not '
+                             'accept, replayed when it recovers '
+                             '(default of no spooling)')
+    parser.add_argument('--prompt-cache', metavar='cachefile',
+                        default=None,
+                        dest='prompt_cache',
+                        help='File to remember learned device prompts in; '
+                             'skips the prompt learning pass at startup '
+                             '(default of no cache)')
+    parser.add_argument('--prompt-ttl', metavar='hours',
+                        default=168,
+                        type=float,
+                        dest='prompt_ttl',
+                        help='Hours a cached prompt is trusted '
+                             '(default of 168)')
+    parser.add_argument('-i', '--idle-timeout', metavar='idletimeout',
+                        default=None,
+                        type=int,
+                        dest='idle_timeout',
+                        help='Seconds an unused SSH session stays open '
+                             'between polls; 0 logs in fresh every poll '
+                             '(default of 3 polling intervals)')
+    parser.add_argument('-k', '--keepalive', metavar='keepalive',
+                        default=30,
+                        type=int,
+                        help='Seconds between SSH keepalives on open '
+                             'sessions (default of 30)')
+    parser.add_argument('--down-after', metavar='failures',
+                        default=3,
+                        type=int,
+                        dest='down_after',
+                        help='Consecutive failed polls before a device is '
+                             'taken out of polling and re-probed in the '
+                             'background (default of 3)')
+    parser.add_argument('--max-backoff', metavar='seconds',
+                        default=3600,
+                        type=int,
+                        dest='max_backoff',
+                        help='Longest wait between re-probes of a down '
+                             'device (default of 3600)')
+    parser.add_argument('--telemetry', action='store_true',
+                        default=False,
+                        help='Write collector timings and counts as the '
+                             'ssh2influx_internal measurement')
+    parser.add_argument('--metrics-port', metavar='port',
+                        default=None,
+                        type=int,
+                        dest='metrics_port',
+                        help='Serve the latest collector timings on '
+                             'http://127.0.0.1:port/metrics; implies '
+                             '--telemetry')
+    parser.add_argument('--profile', metavar='cycles',
+                        default=0,
+                        type=int,
+                        help='Run this many polling cycles with each stage '
+                             'profiled, write a report and exit')
+    parser.add_argument('--profile-report', metavar='reportfile',
+                        default='ssh2influx-profile.txt',
+                        dest='profile_report',
+                        help='Profile report file (default of '
+                             '"ssh2influx-profile.txt")')
+    parser.add_argument('--record', metavar='directory',
+                        default=None,
+                        help='Save the raw output of every command to '
+                             'capture files in this directory')
+    parser.add_argument('--replay', metavar='directory',
+                        default=None,
+                        help='Parse output saved with --record instead of '
+                             'polling devices, report parse throughput '
+                             'and exit')
+    parser.add_argument('--shard', metavar='K/N',
+                        default=None,
+                        type=shardMap.parse_shard,
+                        help='Poll only the devices that hash to shard K of '
+                             'N collectors (default of all devices)')
+    parser.add_argument('--shard-lease', metavar='leasefile',
+                        default=None,
+                        dest='shard_lease',
+                        help='SQLite file shared by the collectors of a '
+                             '--shard run; a collector whose lease expires '
+                             'has its devices taken over by the others '
+                             '(default of no leases)')
+    parser.add_argument('--shard-ttl', metavar='seconds',
+                        default=60,
+                        type=int,
+                        dest='shard_ttl',
+                        help='Seconds a shard lease lasts without a '
+                             'heartbeat (default of 60)')
     args = parser.parse_args()
+    if args.shard_lease and args.shard is None:
+        parser.error('--shard-lease needs --shard')
+    for rate in ('login_rate', 'user_login_rate'):
+        if getattr(args, rate) is not None and getattr(args, rate) <= 0:
+            parser.error(f'--{rate.replace("_", "-")} must be more than 0')
     return args
 
 
 def get_params(paramfile, params):
     # Read specifications file (YAML) that defines how to parse the
-    #   CLI output - return to keep in memory for other processing
-    with open(paramfile, 'r') as file:
-        dictionary = yaml.safe_load(file)
-
-    try:
-        paramresults = eval(f'dictionary{params}')
-    except KeyError:
-        paramresults = None
-    return paramresults
+    #   CLI output - the file is parsed once and cached until it changes
+    #   on disk.  Returns a copy of the top-level params branch, or None
+    dictionary = getEnv.loadyaml(paramfile)
+    return copy.deepcopy(dictionary.get(params))
+
+
+def check_command_schedules(commands):
+    # A command may set its own polling 'frequency' and a 'phase' into
+    # that interval, both in seconds; drop values that cannot be used
+    for item in commands:
+        for key in ('frequency', 'phase'):
+            if key not in item:
+                continue
+            value = item[key]
+            if (not isinstance(value, (int, float)) or
+                    isinstance(value, bool) or value < 0 or
+                    (key == 'frequency' and value == 0)):
+                print(f'WARNING: command [{item.get("cmd")}] has invalid '
+                      f'{key} "{value}" - ignoring it')
+                del item[key]
+
+
+def check_channels(value, where):
+    # Exec channels a device may run at once - a whole number from 1;
+    # an invalid value is ignored
+    if value is None:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        print(f'WARNING: {where} has invalid channels "{value}" - '
+              f'ignoring it')
+        return None
+    return value
 
 
 def get_work(workparams, devicecreds):
@@ -306,325 +1243,868 @@ def get_work(workparams, devicecreds):
     #   allow user to define device group that maps to optionconfig.yaml
     groupcommands = workparams.get('groupcommands', None)
     if groupcommands == None: groupcommands = list()
+    check_command_schedules(groupcommands)
+    # A paramfile may set the polling frequency of its commands that do
+    # not set their own, in place of -f/--frequency
+    frequency = workparams.get('frequency')
+    if frequency is not None and (not isinstance(frequency, (int, float))
+                                  or isinstance(frequency, bool)
+                                  or frequency <= 0):
+        print(f'WARNING: inventory has invalid frequency "{frequency}" - '
+              f'ignoring it')
+        frequency = None
+    # ...and the exec channels of its devices that do not set their own
+    channels = check_channels(workparams.get('channels'), 'inventory')
     default_cred_set = workparams['credential_set']
     default_creds = getEnv.getparam(default_cred_set)
 
-    logging.debug(f'Host list for processing {workparams["hosts"]}')
+    logging.debug('Host list for processing %s', workparams["hosts"])
     worklist = []
+    devices = {device['alias']: device for device in devicecreds}
     for item in workparams['hosts']:
         host = item.get("host")
         specificcommands = item.get("commands")
-        logging.debug(f'Working host {host} with commands {specificcommands}')
-        try:
-            device = [device for device in devicecreds if device['alias'] == host][0]
-        except IndexError:
+        logging.debug('Working host %s with commands %s', host,
+                      specificcommands)
+        device = devices.get(host)
+        if device is None:
             print(f'WARNING: device {host} is not found in '
                   'optionsconfig.yaml - skipping')
             continue
-        logging.debug(f'Working device - {device}')
+        logging.debug('Working device - %s', device)
         username = device.get('username', default_creds["username"])
         password = device.get('password', default_creds["password"])
         mgmthostnameip = device['mgmt_hostnameip']
+        port = device.get('port', 22)
+        # A host entry in the paramfile, then the device entry in
+        # optionsconfig.yaml, then the paramfile inventory
+        device_channels = (
+            check_channels(item.get('channels'), f'host {host}') or
+            check_channels(device.get('channels'), f'device {host}') or
+            channels or 1)
 
         if specificcommands is None:
             commands = groupcommands
         else:
+            check_command_schedules(specificcommands)
             commands = item['commands'] + groupcommands
+        if frequency is not None:
+            commands = [{'frequency': frequency, **command}
+                        for command in commands]
         worklist.append({"hostalias": host,
                          "host": mgmthostnameip,
+                         "port": port,
                          "username": username,
                          "password": password,
                          "commands": commands,
+                         "channels": device_channels,
                          })
-    logging.debug(f'Entire worklist is:\n{worklist}')
+    logging.debug('Entire worklist is:\n%s', worklist)
     return worklist
 
 
-def get_run_specs(args):
-    # Read Influx target, if needed
-    altinflux = get_params(args.paramfile, "['InfluxDB']")
+def prepare_targets(worklist):
+    # Build the device targets for a worklist.  With a prompt cache,
+    # devices learned recently start from the cache and the rest learn
+    # their prompt during their first collection session; otherwise every
+    # device is logged in to once now to learn its prompt
+    targets = [SSHTarget(item) for item in worklist]
+    if PROMPTS is None:
+        print('\n=====Learning device prompts')
+        return COLLECTOR.run(learn_all(targets, COLLECTOR.semaphore))
+
+    print('\n=====Loading device prompts from cache')
+    pending = []
+    for target in targets:
+        cached = PROMPTS.get(target.alias, target.mgmt)
+        if cached is None:
+            pending.append(target.alias)
+            continue
+        target.server_version, target.prompt = cached
+        target.reachable = True
+        logging.debug('%s prompt <%s> from cache', target.alias,
+                      target.prompt)
+    print(f'{len(targets) - len(pending)} prompts from cache, '
+          f'{len(pending)} to learn during first collection')
+    if pending:
+        logging.debug('Devices to learn: %s', pending)
+    return targets
+
+
+def get_influxenv(paramfile):
+    # Read Influx target - the parameters file may name an alternative
+    # to the project-wide server in optionsconfig.yaml
+    altinflux = get_params(paramfile, 'InfluxDB')
     if altinflux is None:
-        influxenv = getEnv.getparam("InfluxDB")
-        print(f'Using project-wide Influx server: {influxenv["alias"]}')
-    else:
-        influxenv = getEnv.getparam(altinflux)
-        print(f'Using alternative Influx server: {influxenv["alias"]}')
+        return getEnv.getparam("InfluxDB"), 'project-wide'
+    return getEnv.getparam(altinflux), 'alternative'
+
+
+def get_paramfiles(args):
+    # The parameters files of the run - each -p entry, with a directory
+    # standing for every .yml/.yaml file in it
+    paramfiles = []
+    for path in args.paramfile:
+        if os.path.isdir(path):
+            paramfiles.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.endswith(('.yml', '.yaml'))))
+        else:
+            paramfiles.append(path)
+    return paramfiles
+
+
+def get_job_names(paramfiles):
+    # With several paramfiles, each is a job named after its file, and
+    # its parsespec ids are qualified by that name ('name:201') so equal
+    # ids in different files never collide; one paramfile keeps its ids
+    if len(paramfiles) == 1:
+        return [None]
+    names = [os.path.splitext(os.path.basename(paramfile))[0]
+             for paramfile in paramfiles]
+    for name in names:
+        if names.count(name) > 1:
+            raise ValueError(f'more than one paramfile is named {name}')
+    return names
+
+
+def qualify(parsespec, job):
+    return parsespec if job is None else f'{job}:{parsespec}'
 
-    # Read inventory from job-specific parameters file to build work list
-    inventory = get_params(args.paramfile, '["inventory"]')
-    logging.debug(f'==Inventory specs\n{inventory}')
+
+def job_parse_specs(paramfile, job):
+    # Read the parsing specifications file containing regex matches and
+    #   influx measurement/tag/key assignments
+    parse_specs = get_params(paramfile, 'parsespecs') or []
+    logging.debug('== Pattern Matching Specs are:\n%s', parse_specs)
+    if job is not None:
+        parse_specs = [{**spec,
+                        'parsespec': qualify(spec.get('parsespec'), job)}
+                       for spec in parse_specs]
+    return parseSpecs.compile_parsespecs(parse_specs)
+
+
+def load_parse_specs(paramfiles):
+    # Compiled specs of every paramfile, for runs that need nothing else
+    try:
+        parse_specs = {}
+        for paramfile, job in zip(paramfiles, get_job_names(paramfiles)):
+            parse_specs.update(job_parse_specs(paramfile, job))
+        return parse_specs
+    except ValueError as e:
+        sys.exit(f'EXITING - invalid parsing specification: {e}')
+
+
+def config_stamps(args):
+    # Modification stamps of the files a job is built from, and the
+    # shards alive when collectors share leases - a shard going down or
+    # coming back reloads the job like a changed file
+    return (tuple((paramfile, getEnv.filestamp(paramfile))
+                  for paramfile in get_paramfiles(args)),
+            getEnv.filestamp("optionsconfig.yaml"),
+            None if LEASE is None else LEASE.live())
+
+
+def shard_worklist(worklist):
+    # The devices this collector's shard polls, among the shards alive
+    if SHARD is None:
+        return worklist
+    live = None if LEASE is None else LEASE.live()
+    owned = [item for item in worklist if SHARD.owns(item['hostalias'], live)]
+    print(f'Shard {SHARD} polls {len(owned)} of {len(worklist)} devices' +
+          ('' if live is None else
+           f' - live shards {", ".join(map(str, live))}'))
+    return owned
+
+
+def merge_commands(commands, additions, parse_specs):
+    # Add commands to a device's command list.  A command already in the
+    # list on the same schedule is sent once and its output parsed by
+    # each parsespec it was given ('also'); streamed output is parsed by
+    # its one spec as it is read, so it is never shared
+    def streams(command):
+        spec = parse_specs.get(command['parsespec'])
+        return spec is not None and spec.streaming
+
+    for command in additions:
+        for existing in commands:
+            if (existing['cmd'] == command['cmd'] and
+                    existing.get('frequency') == command.get('frequency') and
+                    existing.get('phase') == command.get('phase') and
+                    not streams(existing) and not streams(command)):
+                existing.setdefault('also', []).append(command['parsespec'])
+                break
+        else:
+            commands.append(command)
+
+
+def get_jobs(args):
+    # Build the run from every paramfile.  A host alias in several
+    # paramfiles is one device, polled in one session with all of their
+    # commands (logging in as the first paramfile does), and each
+    # parsespec's points go to its own paramfile's Influx target.
+    # Returns the worklist, the compiled parse_specs, the first
+    # paramfile's Influx target and the parsespec routes to the others
+    paramfiles = get_paramfiles(args)
+    if not paramfiles:
+        raise ValueError(f'no paramfiles found in {args.paramfile}')
     # Read group parameters info from environment optionconfig.yaml to
     # map device IPs and creds
     deviceparams = getEnv.getparam(args.group)
-    logging.debug(f'==Device Parameters\n{deviceparams}')
-    worklist = get_work(inventory, deviceparams)
-    logging.debug(f'==Work list\n{worklist}')
+    logging.debug('==Device Parameters\n%s', deviceparams)
+    worklist = {}
+    parse_specs = {}
+    routes = {}
+    influxenv = None
+    for paramfile, job in zip(paramfiles, get_job_names(paramfiles)):
+        jobenv, kind = get_influxenv(paramfile)
+        if influxenv is None:
+            influxenv = jobenv
+            print(f'Using {kind} Influx server: {influxenv["alias"]}')
+        specs = job_parse_specs(paramfile, job)
+        parse_specs.update(specs)
+        if job is not None:
+            print(f'Job {job} from {paramfile} - {len(specs)} parsespecs '
+                  f'to {kind} Influx server {jobenv["alias"]}')
+            routes.update((key, jobenv) for key in specs)
+
+        # Read inventory from job-specific parameters file to build work list
+        inventory = get_params(paramfile, 'inventory')
+        logging.debug('==Inventory specs\n%s', inventory)
+        for item in get_work(inventory, deviceparams):
+            commands = [{**command,
+                         'parsespec': qualify(command['parsespec'], job)}
+                        for command in item['commands']]
+            merged = worklist.get(item['hostalias'])
+            if merged is None:
+                merged = worklist[item['hostalias']] = {**item,
+                                                        'commands': []}
+            elif any(merged[key] != item[key] for key in LOGIN_KEYS):
+                print(f'WARNING: {paramfile} logs in to '
+                      f'{item["hostalias"]} differently from an earlier '
+                      f'paramfile - using the earlier settings')
+            merge_commands(merged['commands'], commands, parse_specs)
+    worklist = shard_worklist(list(worklist.values()))
+    logging.debug('==Work list\n%s', worklist)
+    return worklist, parse_specs, influxenv, routes
+
+
+def get_run_specs(args):
+    global CONFIG_STAMPS
+    CONFIG_STAMPS = config_stamps(args)
+    try:
+        worklist, parse_specs, influxenv, routes = get_jobs(args)
+    except ValueError as e:
+        sys.exit(f'EXITING - invalid parameters: {e}')
+    ROUTES.update(routes)
 
     # Do initial connections and prompt determination with devices
-    print('\n=====Learning device prompts')
-    with ThreadPoolExecutor(max_workers=THREADS, 
-                            thread_name_prefix='DeviceLearn') as executor:
-        processed_results = list(executor.map(SSHTarget, worklist))
+    processed_results = prepare_targets(worklist)
 
     inventory = {}
-    logging.debug(f'Processed device targets are:\n{processed_results}')
+    logging.debug('Processed device targets are:\n%s', processed_results)
     for item in processed_results:
-        logging.debug(f'{item.alias}: {item}')
+        logging.debug('%s: %s', item.alias, item)
         inventory[item.alias] = item
     logging.debug(inventory)
-    logging.debug(f'==Inventory\n{inventory}')
+    logging.debug('==Inventory\n%s', inventory)
 
-    reachable_devices = [device.alias for device in processed_results if device.reachable]
-    unreachable_devices = [device.alias for device in processed_results if not device.reachable]
+    # Devices still to be learned (reachable of None) count as reachable
+    reachable_devices = [device.alias for device in processed_results if device.reachable is not False]
+    unreachable_devices = [device.alias for device in processed_results if device.reachable is False]
     
     if len(unreachable_devices) > 0:
         print(f'Unreachable devices {len(unreachable_devices)}\n'
               f'{unreachable_devices}\n')
-    logging.debug(f'==Reachable Devices:\n{reachable_devices}')
-    logging.debug(f'==UNReachable Devices:\n{unreachable_devices}')
-    # Read the parsing specifications file containing regex matches and
-    #   influx measurement/tag/key assignments
-    parse_specs = get_params(args.paramfile, '["parsespecs"]')
-    logging.debug(f'== Pattern Matching Specs are:\n{parse_specs}')
+    logging.debug('==Reachable Devices:\n%s', reachable_devices)
+    logging.debug('==UNReachable Devices:\n%s', unreachable_devices)
 
     return worklist, inventory, parse_specs, influxenv, \
         reachable_devices, unreachable_devices
 
 
+def reload_run_specs(args, worklist, inventory, parse_specs, influxenv):
+    # Called at a cycle boundary.  When the parameters file or
+    # optionsconfig.yaml has changed on disk, apply only the differences
+    # to the running job - the worklist, inventory, parse_specs and
+    # influxenv objects are updated in place so the scheduled job sees
+    # them.  Unchanged devices keep their learned prompts and sessions
+    global CONFIG_STAMPS, PARSER, RELEARN_PENDING
+    try:
+        stamps = config_stamps(args)
+    except OSError as e:
+        # A file briefly missing - mid atomic save, or removed from a -p
+        # directory - is checked again at the next interval
+        print(f'WARNING: configuration files unreadable, keeping the '
+              f'running configuration - {e}')
+        return
+    if stamps == CONFIG_STAMPS:
+        if not RELEARN_PENDING:
+            return
+        print(f'\n=====Re-learning devices that were busy at the last '
+              f'reload')
+    elif stamps[:2] == CONFIG_STAMPS[:2]:
+        print(f'\n=====Live shards changed at {time.ctime()}')
+    else:
+        print(f'\n=====Configuration change detected at {time.ctime()}')
+    previous, CONFIG_STAMPS = CONFIG_STAMPS, stamps
+
+    try:
+        new_worklist, new_specs, new_influxenv, new_routes = get_jobs(args)
+    except OSError as e:
+        # Gone between the stamps and the read - try again next interval
+        CONFIG_STAMPS = previous
+        print(f'WARNING: configuration files unreadable, keeping the '
+              f'running configuration - {e}')
+        return
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f'WARNING: configuration not reloaded, keeping the running '
+              f'configuration - {e!r}')
+        return
+
+    if new_influxenv != influxenv:
+        influxenv.clear()
+        influxenv.update(new_influxenv)
+        print(f'Now using Influx server: {influxenv["alias"]}')
+    if new_routes != ROUTES:
+        ROUTES.clear()
+        ROUTES.update(new_routes)
+
+    if ({key: spec.spec for key, spec in new_specs.items()} !=
+            {key: spec.spec for key, spec in parse_specs.items()}):
+        parse_specs.clear()
+        parse_specs.update(new_specs)
+        print(f'Parsing specifications reloaded - {len(parse_specs)} specs')
+        if PARSER is not None:
+            # New polls parse with the new pool straight away; polls
+            # already running may still hand output to the old one
+            retired = PARSER
+            PARSER = parseWorkers.ParsePool(parse_specs, retired.workers,
+                                            observer=retired.observer,
+                                            refine=retired.refine)
+            polls = [thread for thread in threading.enumerate()
+                     if thread.name.startswith('Poll-')]
+            threading.Thread(target=retire_parser,
+                             args=(retired, polls),
+                             name='ParseRetire', daemon=True).start()
+
+    old = {item['hostalias']: item for item in worklist}
+    new = {item['hostalias']: item for item in new_worklist}
+    added = [alias for alias in new if alias not in old]
+    removed = [alias for alias in old if alias not in new]
+    relearn = []
+    deferred = []
+    for alias in new:
+        if alias in old and new[alias] != old[alias]:
+            if all(new[alias][key] == old[alias][key]
+                   for key in LOGIN_KEYS):
+                # Same device and login - only the commands or channels
+                # changed
+                inventory[alias].commands = new[alias]['commands']
+                inventory[alias].channels = new[alias]['channels']
+            elif inventory[alias].busy:
+                # Its poll is still running on the old target and
+                # session - replace them at the next interval instead
+                deferred.append(alias)
+            else:
+                relearn.append(alias)
+
+    for alias in removed + relearn:
+        target = inventory.pop(alias, None)
+        if COLLECTOR.sessions is not None and \
+                not (target is not None and target.busy):
+            # A removed device's poll still using its session leaves
+            # it to the idle evictor
+            COLLECTOR.loop.call_soon_threadsafe(
+                COLLECTOR.sessions.discard, alias)
+    if added or relearn:
+        for target in prepare_targets([new[alias]
+                                       for alias in added + relearn]):
+            inventory[target.alias] = target
+    # Deferred devices keep their old entry, so the next reload still
+    # sees them as changed
+    worklist[:] = [old[item['hostalias']]
+                   if item['hostalias'] in deferred else item
+                   for item in new_worklist]
+    RELEARN_PENDING = bool(deferred)
+    print(f'Inventory reloaded - {len(added)} added, {len(removed)} '
+          f'removed, {len(relearn)} re-learned, {len(deferred)} deferred, '
+          f'{len(worklist)} total')
+
+
+def retire_parser(parser, polls):
+    # Close a replaced ParsePool once the poll threads that were running
+    # when it was replaced have finished with it
+    for thread in polls:
+        thread.join()
+    parser.close()
+
+
 def extract_matches(parsespecs, aggregate_output):
-    # Use the specs input to do pattern matches against the collected output
+    # Use the compiled specs (see common/parseSpecs.py) to do pattern
+    # matches against the collected output
     measurements = []
-    print(f'\n=====Processing output of hosts...')
 
     for device_results in aggregate_output:
         for output in device_results:
             print(f'Processing: [{output[0]}]')
-            logging.debug(f'Working on device <{output[0]}> '
-                          f'for command <{output[1]}> '
-                          f'with parsespec <{output[2]}>')
-            parsespec = [parsespec for parsespec in parsespecs
-                         if parsespec["parsespec"] == output[2]][0]
-
-            measurement = [output[0], parsespec["measurement"]]
-            logging.debug(f'Measurement currently: {measurement}')
-
-            statictags = parsespec.get("statictags")
-            if statictags:
-                logging.debug(f'extract_matches: Static tags are: {statictags}')
-
-                for statictag in statictags:
-                    tagname = statictag.get("tagname")
-                    tagvalue = statictag.get("tagvalue")
-                    measurement.append((tagname, 'tag', 'string',
-                                        tagvalue))
-
-            ''' There are three matchtypes to handle -
+            logging.debug('Working on device <%s> for command <%s> with '
+                          'parsespec <%s>', output[0], output[1], output[2])
+            parsespec = parsespecs.get(output[2])
+            if parsespec is None:
+                print(f'WARNING: parsespec {output[2]} for command '
+                      f'[{output[1]}] is not defined - skipping')
+                continue
+
+            ''' There are four matchtypes to handle -
             single - scans over output and associates tags to output serially
             multiple - scans over output and associates tags to output 
                multiple times - e.g. interface or process data, line-by-line
             iterative - multiple scans over the same output
+            table - splits each row of columnar output under its header
             ''' 
-            if parsespec["matchtype"] == 'single':
-                logging.debug(f'Working a single matchtype')
-                logging.debug(f'regex pattern is:\n{parsespec["regex"]}')
-                logging.debug(f'output to search is:\n{output[3]}')
-
-                x = re.search(fr'{parsespec["regex"]}', output[3], 
-                              re.S | re.M)
-                logging.debug(f'Got a search result of {x}')
-                if x:
-                    logging.debug(f'Matching groups -  {x.groups()}')
-                    for index, item in enumerate(x.groups(), start=1):
-                        matchname = f'parsespec["match{index}"]'
-                        matchkeytype = f'parsespec["match{index}keytype"]'
-                        matchvaluetype = f'parsespec["match{index}valuetype"]'
-                        matchvalue = f'{item}'
-                        logging.debug(f'Tag |{eval(matchname)}|'
-                                      f'is a |{eval(matchkeytype)}| '
-                                      f'of type {eval(matchvaluetype)} '
-                                      f'with value: |{matchvalue}|')
-                        measurement.append((eval(matchname),
-                                            eval(matchkeytype),
-                                            eval(matchvaluetype),
-                                            matchvalue))
-                    measurements.append(measurement)
-
-            elif parsespec["matchtype"] == 'multiple':
-                logging.debug(f'Working a multiple matchtype')
-                logging.debug(f'regex pattern is:\n{parsespec["regex"]}')
-                logging.debug(f'output to search is:\n{output[3]}')
-                
-                matches = re.findall(fr'{parsespec["regex"]}', output[3],
-                               re.S | re.M)
-                logging.debug(f'Groups matching are:\n{matches}')
-                for matcheditem in matches:
-                    logging.debug(f'Processing item: {matcheditem}')
-                    # Reset measurement for each instance (only multiple)
-                    measurement = [output[0], parsespec["measurement"]]
-                    for index, item in enumerate(matcheditem, start=1):
-                        # Get individual match data
-                        matchname = f'parsespec["match{index}"]'
-                        matchkeytype = f'parsespec["match{index}keytype"]'
-                        matchvaluetype = f'parsespec["match{index}valuetype"]'
-                        matchvalue = f'matcheditem[{index - 1}]'
-                        logging.debug(f'    Tag |{eval(matchname)}| '
-                                      f'is a |{eval(matchkeytype)}| '
-                                      f'of type {eval(matchvaluetype)} '
-                                      f'with value: |{eval(matchvalue)}|')
-                        measurement.append((eval(matchname),
-                                            eval(matchkeytype),
-                                            eval(matchvaluetype),
-                                            eval(matchvalue)))
-                    measurements.append(measurement)
-                logging.debug(f'Current measurements are:'
-                              f'{pprint.pprint(measurements)}')
-                            
-            elif parsespec["matchtype"] == 'iterative':
-                logging.debug(f'Working an iterative matchtype')
-                measurement = [output[0], parsespec["measurement"]]
-                logging.debug(f'extract_matches(iterative): Current measurement is: {measurement}')
-                
-                regexmatches = parsespec["regexmatches"]
-
-                for groupspec in regexmatches:
-                    logging.debug(f'DEBUG extract_matches(iterative): Current groupspec is: {groupspec}')
-                    # See if we have a multimatch group - special handling
-                    if "groups" in groupspec:
-                        x = re.findall(fr'{groupspec["regex"]}',
-                                       output[3],
-                                       re.S | re.M)
-                        # TO-DO: Add logic for no match
-                        logging.debug(f'DEBUG: group match(es) is/are:\n {x}')
-                        for count, match in enumerate(x):
-                            measurement.append((groupspec["groups"][count]["groupname"],
-                                                groupspec["groups"][count]["groupkeytype"],
-                                                groupspec["groups"][count]["groupvaluetype"],
-                                                match.strip()))
-                    else:
-                        # Regular processing
-                        x = re.search(fr'{groupspec["regex"]}', 
-                                          output[3],
-                                          re.S | re.M)
-                        if x == None:
-                            print(f'WARNING: No match of [{groupspec["regex"]}] on {output[0]} - skipping')
-                            continue
-                        logging.debug(f'DEBUG groupmatch is: {x.group(1)}')
-                        measurement.append((groupspec["groupname"],
-                                            groupspec["groupkeytype"],
-                                            groupspec["groupvaluetype"],
-                                            x.group(1).strip()))
-                measurements.append(measurement)
+            began = time.perf_counter()
+            found = parsespec.extract(output[0], output[3])
+            if TELEMETRY is not None:
+                TELEMETRY.parsed(output[0], output[2],
+                                 time.perf_counter() - began, len(found))
+            if CHANGES is not None:
+                found = CHANGES.apply(output[2], found)
+            logging.debug('%s matched: %s', parsespec, found)
+            measurements.extend(found)
     return measurements
 
 
-def assemble_influx_lp(measurements):
-    # Take list of measurements and assemble into Influx Line Protocol
-    logging.debug(f'assemble_influx_lp: Measurements to process:\n{measurements}')
-    influxlines = ""
-    for item in measurements:
-        logging.debug(f'assemble_influx_lp: Working item:\n{item}')
-        device = item.pop(0)
-        measurement = item.pop(0)
-        mtags = [x for x in item if x[1] == 'tag']
-        mfields = [x for x in item if x[1] == 'field']
-        logging.debug(f'Tags: {mtags}\nFields: {mfields}')
-        influxline = f'{measurement},device={device},'
-        for mtagitem in mtags:
-            tagkey = f'{mtagitem[0]}={mtagitem[3]}'.strip().replace(' ', '\ ')
-            # print(f'|{tagkey}|')
-            nonspacestr = re.sub(r'(\\\s){2,}', "", tagkey)
-            if nonspacestr.endswith('\ '):
-                nonspacestr = nonspacestr.replace('\ ', '')
-            influxline += nonspacestr + ','
-        influxline = influxline.rstrip(',')
-        influxline += ' '
-        for mfielditem in mfields:
-            # if string
-            if mfielditem[2] == 'string':
-                influxline += f'{mfielditem[0]}="{mfielditem[3]}",'
-            else:
-                # if float, int, boolean, decimal
-                influxline += f'{mfielditem[0]}={mfielditem[3]},'
-        influxline = influxline.rstrip(',')
-        logging.debug(f'DEBUG assemble_influx_lp: current influxline - {influxline}')
-        influxlines += influxline + '\n'
-    logging.debug(f'DEBUG assemble_influx_lp: influxlines are\n{influxlines}')
+def assemble_influx_lp(measurements, timestamp=None):
+    # Take list of measurements and assemble into Influx Line Protocol,
+    # stamped with the collection time (see common/lineProtocol.py)
+    logging.debug('assemble_influx_lp: Measurements to process:\n%s',
+                  measurements)
+    influxlines = ENCODER.encode(measurements, timestamp)
+    logging.debug('DEBUG assemble_influx_lp: influxlines are\n%s',
+                  influxlines)
     return influxlines
 
 
+def get_writer(influxenv):
+    # One batched, keep-alive writer per Influx target, shared by every
+    # polling cycle (see common/influxWriter.py), and its disk spool
+    # when --spool is in use (see common/writeSpool.py)
+    with WRITERS_LOCK:
+        writer = WRITERS.get(influxenv["alias"])
+        if writer is None:
+            writer = influxWriter.InfluxWriter(influxenv,
+                                               precision=ENCODER.precision)
+            WRITERS[influxenv["alias"]] = writer
+            if SPOOL_DIR:
+                SPOOLS[writer.alias] = writeSpool.WriteSpool(
+                    os.path.join(SPOOL_DIR, writer.alias), writer,
+                    max_bytes=int(influxenv.get('spool_max_mb', 1024))
+                    * 1024 * 1024,
+                    max_age=float(influxenv.get('spool_max_age_hours', 24))
+                    * 3600,
+                    segment_bytes=int(influxenv.get('spool_segment_mb', 16))
+                    * 1024 * 1024,
+                    drain_rate=int(influxenv.get('spool_drain_rate', 20000)))
+    return writer
+
+
 def send_to_influx(influxenv, measurements):
     # Send incoming measurements to InfluxDB - measurements must be
     # in Influx line protocol format.  influxenv is a dictionary of
     # Influx server parameters - protcol, host, port, bucket, org,
-    # and API token for writing
-    influxurl = (f'{influxenv["protocol"]}://'
-                 f'{influxenv["host"]}:{influxenv["port"]}'
-                 f'/api/v2/write?bucket={influxenv["bucket"]}'
-                 f'&org={influxenv["org"]}&precision=s')
-
-    headers = {
-    'Accept': 'application/json',
-    'Authorization': 'Token ' + influxenv["token"],
-    'Content-Type': 'text/plain'
-    }
-
-    try:
-        response = requests.request("POST", influxurl, headers=headers,
-                                    data=measurements)
-        response.raise_for_status()
-        print(f'{response.status_code} - {response.reason} - {response.text}')
-        if response.status_code == 204:
-            print('Good data push to InfluxDB')
-    except requests.exceptions.HTTPError as errh:
-        print("Http Error:", errh)
-    except requests.exceptions.ConnectionError as errc:
-        print("Error Connecting to InfluxDB server!  Error was:\n", errc)
-    except requests.exceptions.Timeout as errt:
-        print("Timeout Error:", errt)
-    except requests.exceptions.RequestException as err:
-        print("Oops: Something Else", err)
+    # and API token for writing, plus optional writer settings
+    writer = get_writer(influxenv)
+    began = time.monotonic()
+    failed, rejected = writer.write(measurements)
+    if TELEMETRY is not None:
+        TELEMETRY.wrote(writer.alias, time.monotonic() - began,
+                        measurements.count('\n'),
+                        len(failed) + len(rejected))
+    if rejected:
+        # Spooling these would only block the replay of everything
+        # behind them
+        print(f'InfluxDB {writer.alias} rejected {len(rejected)} '
+              f'batch(es) - dropping them')
+    if failed:
+        print(f'Failed to write {len(failed)} batch(es) to InfluxDB '
+              f'{writer.alias}')
+        spool = SPOOLS.get(writer.alias)
+        if spool is not None:
+            spooled = spool.append(failed)
+            print(f'Spooled {spooled} lines to disk for later replay')
+    elif measurements and not rejected:
+        print('Good data push to InfluxDB')
     
     print(f'\nFinished at: {str(time.ctime())}')
+    return failed + rejected
+
+
+def write_later(influxenv, influx_lines):
+    # Hand line protocol to the writer thread without waiting for it.
+    # While InfluxDB is slow or down the queue fills, and further polls'
+    # lines go straight to the spool (or are dropped without one), so
+    # polls never back up behind writes
+    try:
+        WRITE_QUEUE.put_nowait((influxenv, influx_lines))
+        return
+    except queue.Full:
+        pass
+    writer = get_writer(influxenv)
+    spool = SPOOLS.get(writer.alias)
+    if spool is None:
+        lines = influx_lines.count('\n')
+        print(f'WARNING: InfluxDB {writer.alias} writes are backed up - '
+              f'dropping {lines} lines')
+        return
+    spooled = spool.append([influx_lines])
+    print(f'InfluxDB {writer.alias} writes are backed up - spooled '
+          f'{spooled} lines to disk for later replay')
+
+
+def write_queued():
+    # Writer thread for scheduled polls - sends whatever has queued up
+    # since its last write, one write per Influx target
+    while True:
+        batch = [WRITE_QUEUE.get()]
+        while len(batch) < STREAM_BATCH:
+            try:
+                batch.append(WRITE_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+        targets = {}
+        for influxenv, influx_lines in batch:
+            targets.setdefault(influxenv['alias'],
+                               (influxenv, []))[1].append(influx_lines)
+        for influxenv, lines in targets.values():
+            try:
+                send_to_influx(influxenv, ''.join(lines))
+            except Exception as e:
+                print(f'ERROR: write to InfluxDB {influxenv["alias"]} '
+                      f'failed - {e!r}')
+
+
+def split_by_influx(device_results, influxenv):
+    # Collected records grouped by the Influx target their parsespec
+    # writes to - all to influxenv unless several paramfiles with their
+    # own targets are loaded.  Returns (influxenv, device_results) pairs
+    if not ROUTES:
+        return [(influxenv, device_results)]
+    groups = {}
+    for records in device_results:
+        for record in records:
+            target = ROUTES.get(record[2], influxenv)
+            groups.setdefault(target['alias'], (target, []))[1].append(record)
+    return [(target, [records]) for target, records in groups.values()]
+
+
+async def parse_device(target, semaphore, pool, parsespecs, queue,
+                       influxenv):
+    # Collect one device, then parse it and queue its line protocol
+    # straight away rather than waiting for the rest of the cycle.
+    # Streamed outputs are queued a block at a time while still being
+    # read, stamped with the time their output began
+    async def sink(parsespec, measurements, collected):
+        if TELEMETRY is not None:
+            TELEMETRY.parsed(target.alias, parsespec, 0.0,
+                             len(measurements), outputs=0)
+        if CHANGES is not None:
+            measurements = CHANGES.apply(parsespec, measurements)
+        if measurements:
+            await queue.put((ROUTES.get(parsespec, influxenv),
+                             assemble_influx_lp(measurements, collected)))
+
+    target.sink = sink
+    try:
+        records = await target.run_commands(semaphore, pool)
+    finally:
+        target.sink = None
+    if not records:
+        return
+    collected = time.time()
+    for influx, results in split_by_influx([records], influxenv):
+        if PARSER is not None:
+            # Hand the device's records to a worker process as one chunk
+            print(f'Processing: [{target.alias}]')
+            measurements = await asyncio.wrap_future(
+                PARSER.submit(results[0]))
+        else:
+            measurements = extract_matches(parsespecs, results)
+        if measurements:
+            await queue.put((influx,
+                             assemble_influx_lp(measurements, collected)))
+
+
+async def write_stream(queue, send=send_to_influx):
+    # Drain the queue of (Influx target, line protocol) as devices
+    # finish.  Everything that arrived while the previous write was in
+    # flight goes out as the next batch for each target, so writes stay
+    # few under load and prompt when the queue is quiet
+    loop = asyncio.get_running_loop()
+    lines_sent = 0
+    done = False
+    while not done:
+        batch = [await queue.get()]
+        while not queue.empty() and len(batch) < STREAM_BATCH:
+            batch.append(queue.get_nowait())
+        if batch[-1] is None:
+            batch.pop()
+            done = True
+        targets = {}
+        for influxenv, influx_lines in batch:
+            targets.setdefault(influxenv['alias'],
+                               (influxenv, []))[1].append(influx_lines)
+        for influxenv, lines in targets.values():
+            influx_lines = ''.join(lines)
+            lines_sent += influx_lines.count('\n')
+            if DEBUG:
+                print(f'\n=====Streamed Influx line protocol output:\n'
+                      f'{influx_lines}')
+            else:
+                await loop.run_in_executor(None, send, influxenv,
+                                           influx_lines)
+    return lines_sent
+
+
+async def collect_stream(targets, semaphore, pool, parsespecs, influxenv,
+                         send=send_to_influx):
+    # Pipelined cycle - collect, parse and write per device, with a
+    # bounded queue between the parsers and the single writer
+    queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    writer = asyncio.ensure_future(write_stream(queue, send))
+    try:
+        await asyncio.gather(*(parse_device(target, semaphore, pool,
+                                            parsespecs, queue, influxenv)
+                               for target in targets))
+        if TELEMETRY is not None:
+            await queue.put((influxenv,
+                             ENCODER.encode(TELEMETRY.drain(SPOOLS))))
+    finally:
+        await queue.put(None)
+    return await writer
+
+
+def poll_targets(targets, parse_specs, influxenv, send=send_to_influx):
+    # Collect, parse and send to Influx for a group of devices; down
+    # devices are left to the background prober.  send is given each
+    # Influx target's line protocol
+    startTime = time.time()
+    polling = [target for target in targets if target.health.polling()]
+    down = [target for target in targets if not target.health.polling()]
+    if down:
+        print(f'Skipping {len(down)} down device(s): ' +
+              ', '.join(f'{target.alias} (next probe in '
+                        f'{target.health.retry_in():.0f}s)'
+                        for target in down))
+
+    # All device sessions run on the shared collector event loop
+    if STREAM:
+        lines_sent = COLLECTOR.run(collect_stream(polling,
+                                                  COLLECTOR.semaphore,
+                                                  COLLECTOR.sessions,
+                                                  parse_specs, influxenv,
+                                                  send))
+        print(f'\n=====COMPLETED streaming {lines_sent} Influx lines')
+    else:
+        command_results = COLLECTOR.run(collect_all(polling,
+                                                    COLLECTOR.semaphore,
+                                                    COLLECTOR.sessions))
+        logging.debug('Total command_results:\n%s', command_results)
+        #print(command_results)
+        print(f'\n=====Processing output of hosts...')
+        writes = {}
+        for influx, results in split_by_influx(command_results, influxenv):
+            if PARSER is not None:
+                measurements = PARSER.extract(results)
+            else:
+                measurements = extract_matches(parse_specs, results)
+            logging.debug(measurements)
+            # Every point in the poll carries the time collection started
+            writes[influx['alias']] = (influx, assemble_influx_lp(
+                measurements, startTime))
+        if TELEMETRY is not None:
+            # Counted up to now; this poll's write shows in the next one
+            influx, influx_lines = writes.get(influxenv['alias'],
+                                              (influxenv, ''))
+            writes[influxenv['alias']] = (influx, influx_lines +
+                                          ENCODER.encode(
+                                              TELEMETRY.drain(SPOOLS)))
+        for influx, influx_lines in writes.values():
+            print(f'\n=====COMPLETED processing - Final Influx line protocol output is:\n{influx_lines}')
+
+            # Send to Influx
+            if not DEBUG:
+                send(influx, influx_lines)
+    if PROMPTS is not None:
+        PROMPTS.save()
 
 
 def main_loop(worklist, inventory, parse_specs, influxenv):
-    # At this point we've built a list of workable items, we can now
-    #   build an asynchronous work queue and execute as fast as they
-    #   respond
+    # One polling cycle of every device at once, as used for debug runs
     startTime = time.time()
-    command_results = []
     print(f'\n=====Collecting commands for hosts on {time.ctime()}')
-
-    # Refactored
-    with ThreadPoolExecutor(max_workers=THREADS, 
-                            thread_name_prefix='CollectCmds') as executor:
-        futureresults = {executor.submit(inventory[item['hostalias']].run_commands) for item in worklist}
-        for future in as_completed(futureresults):
-            command_results.append(future.result())
-    logging.debug(f'Total command_results:\n{command_results}')
-    #print(command_results)
-    measurements = extract_matches(parse_specs, command_results)
-    logging.debug(measurements)
-    influx_lines = assemble_influx_lp(measurements)
-    print(f'\n=====COMPLETED processing - Final Influx line protocol output is:\n{influx_lines}')
-    
-    # Send to Influx
-    if not DEBUG:
-        send_to_influx(influxenv, influx_lines)
+    poll_targets([inventory[item['hostalias']] for item in worklist],
+                 parse_specs, influxenv)
     executionTime = (time.time() - startTime)
     print(f'Execution time in seconds: {executionTime:.3f}')
     print('==========\n')
-    #print(f'\nWaiting for next polling interval [scheduled every {FREQUENCY} sec]', end='', flush=True)
-    print(f'\nWaiting for next polling interval [scheduled every {FREQUENCY} sec]')
 
 
-def run_threaded(job_func, worklist, inventory, parse_specs, influxenv):
-    job_thread = threading.Thread(target=job_func, args=(worklist,
-                                                         inventory,
-                                                         parse_specs,
-                                                         influxenv,))
-    print(f'\nRunning new thread {threading.current_thread().ident} at {time.ctime()}')
-    job_thread.start()
+def poll_slot(due, parse_specs, influxenv, scheduler):
+    # Scheduled poll of the devices whose commands came due in one tick;
+    # runs in its own thread so a slow device never delays the ticks.
+    # The writes are left to the writer thread, so the devices are free
+    # for their next poll once their output is parsed
+    try:
+        print(f'\n=====Collecting commands for '
+              f'{", ".join(target.alias for target, _ in due)} on '
+              f'{time.ctime()}')
+        poll_targets([target for target, _ in due], parse_specs, influxenv,
+                     send=write_later)
+    finally:
+        for target, slot in due:
+            target.busy = False
+            target.due = None
+            if target.health.polling():
+                scheduler.record_poll(target.alias, slot, target.started)
+
+
+def profile_run(cycles, report, worklist, inventory, parse_specs,
+                influxenv):
+    # Run whole polling cycles with each stage under its own cProfile
+    # and tracemalloc accounting (see common/stageProfiler.py), then
+    # write the summary report and a .prof file per stage
+    profiler = stageProfiler.StageProfiler(['connect', 'command', 'parse',
+                                            'encode', 'write'])
+    print(f'\n=====Profiling {cycles} polling cycles')
+    try:
+        for cycle in range(1, cycles + 1):
+            startTime = time.time()
+            targets = [inventory[item['hostalias']] for item in worklist]
+            targets = [target for target in targets
+                       if target.health.polling()]
+            if COLLECTOR.sessions is not None:
+                # Logins are only separable from commands when pooled;
+                # after the first cycle this times session reuse checks
+                COLLECTOR.run(profiler.profiled(
+                    'connect', connect_all(targets, COLLECTOR.semaphore,
+                                           COLLECTOR.sessions)))
+            command_results = COLLECTOR.run(profiler.profiled(
+                'command', collect_all(targets, COLLECTOR.semaphore,
+                                       COLLECTOR.sessions)))
+            for influx, results in split_by_influx(command_results,
+                                                   influxenv):
+                with profiler.stage('parse'):
+                    if PARSER is not None:
+                        measurements = PARSER.extract(results)
+                    else:
+                        measurements = extract_matches(parse_specs, results)
+                with profiler.stage('encode'):
+                    influx_lines = assemble_influx_lp(measurements,
+                                                      startTime)
+                if not DEBUG:
+                    with profiler.stage('write'):
+                        send_to_influx(influx, influx_lines)
+            print(f'Profiled cycle {cycle} of {cycles} in '
+                  f'{time.time() - startTime:.3f} seconds')
+        with open(report, 'w') as reportfile:
+            reportfile.write(profiler.report())
+        paths = profiler.dump(os.path.splitext(report)[0])
+    finally:
+        profiler.stop()
+    print(f'\nProfile report written to {report}\n'
+          f'Per-stage cProfile data: {", ".join(paths)}')
+
+
+def replay_run(directory, parse_specs):
+    # Parse output recorded with --record (see common/outputCapture.py)
+    # as if it had just been collected - no SSH and nothing written to
+    # InfluxDB.  Each device poll keeps its recorded collection time;
+    # debug mode shows the resulting line protocol
+    print(f'\n=====Replaying recorded output from {directory}')
+    frames = outputCapture.read_captures(directory)
+    polls = outputs = nbytes = points = lines = 0
+    parse_seconds = encode_seconds = 0.0
+    with open(os.devnull, 'w') as quiet:
+        while True:
+            batch = list(itertools.islice(frames, REPLAY_BATCH))
+            if not batch:
+                break
+            polls += len(batch)
+            for _, records in batch:
+                outputs += len(records)
+                nbytes += sum(len(record[3]) for record in records)
+            began = time.perf_counter()
+            with contextlib.redirect_stdout(sys.stdout if DEBUG else quiet):
+                if PARSER is not None:
+                    futures = [PARSER.submit(records)
+                               for _, records in batch]
+                    parsed = [future.result() for future in futures]
+                else:
+                    parsed = [extract_matches(parse_specs, [records])
+                              for _, records in batch]
+            parse_seconds += time.perf_counter() - began
+            began = time.perf_counter()
+            influx_lines = ''.join(
+                assemble_influx_lp(measurements, collected)
+                for (collected, _), measurements in zip(batch, parsed))
+            encode_seconds += time.perf_counter() - began
+            points += sum(len(measurements) for measurements in parsed)
+            lines += influx_lines.count('\n')
+            if DEBUG:
+                print(influx_lines, end='')
+    if not polls:
+        print(f'WARNING: no recorded output found in {directory}')
+        return
+    print(f'Replayed {polls} device polls, {outputs} outputs, '
+          f'{nbytes / 1048576:.1f} MiB')
+    print(f'Parse:  {parse_seconds:.3f} sec, '
+          f'{outputs / parse_seconds if parse_seconds else 0:.0f} outputs/s, '
+          f'{nbytes / 1048576 / parse_seconds if parse_seconds else 0:.1f} '
+          f'MiB/s, {points} points')
+    print(f'Encode: {encode_seconds:.3f} sec, {lines} lines')
+
+
+def run_scheduler(args, worklist, inventory, parse_specs, influxenv):
+    # Poll every device at its own stable offset into the interval, or
+    # into each command's own frequency (see common/pollScheduler.py);
+    # the commands due for a device in a tick share one session.  A
+    # device still busy with its previous poll is skipped, never polled
+    # twice at once.
+    # Configuration reloads (of the paramfiles and group in args) and the
+    # skip/late summary happen once per interval, between ticks
+    scheduler = pollScheduler.PollScheduler(FREQUENCY, tick=TICK)
+    print(f'\nPolling {len(worklist)} devices spread across every '
+          f'{FREQUENCY} sec interval')
+    last = time.time()
+    cycle = scheduler.cycle(last)
+    while True:
+        now = scheduler.wait(last)
+        if scheduler.cycle(now) != cycle:
+            cycle = scheduler.cycle(now)
+            print(f'\n=====Polling interval summary: {scheduler.report()}')
+            if LIMITER is not None:
+                print(f'Concurrency limit is {LIMITER.report()}')
+            reload_run_specs(args, worklist, inventory, parse_specs,
+                             influxenv)
+        due = []
+        devices = [(item['hostalias'], inventory[item['hostalias']].commands)
+                   for item in worklist]
+        for alias, slot, commands in scheduler.due(devices, last, now):
+            target = inventory[alias]
+            if target.busy:
+                print(f'WARNING: {alias} poll skipped - previous poll '
+                      f'still running')
+                scheduler.record_skip(alias)
+                continue
+            target.busy = True
+            target.due = commands
+            due.append((target, slot))
+        last = now
+        if due:
+            threading.Thread(target=poll_slot,
+                             args=(due, parse_specs, influxenv, scheduler),
+                             name=f'Poll-{int(now)}').start()
 
 
 ####
@@ -636,49 +2116,125 @@ if __name__ == '__main__':
 
     DEBUG = args.debug
     FREQUENCY = args.frequency
-    THREADS = args.threads
+    CONCURRENCY = args.concurrency
+    COMMAND_MODE = args.command_mode
+    PIPELINE_DEPTH = args.pipeline
+    COMMAND_TIMEOUT = args.command_timeout
+    STREAM = args.stream
+    SPOOL_DIR = args.spool
+    DOWN_AFTER = args.down_after
+    MAX_BACKOFF = args.max_backoff
+    if args.telemetry or args.metrics_port:
+        TELEMETRY = selfTelemetry.SelfTelemetry()
+        if args.metrics_port:
+            selfTelemetry.MetricsServer(TELEMETRY, args.metrics_port)
+            print(f'Serving collector metrics on '
+                  f'http://127.0.0.1:{args.metrics_port}/metrics')
+    if args.prompt_cache:
+        PROMPTS = promptCache.PromptCache(args.prompt_cache,
+                                          ttl=args.prompt_ttl * 3600)
     if DEBUG:
         logging.basicConfig(level=logging.DEBUG, 
                             format='%(relativeCreated)6d %(threadName)s %(message)s')
 
-    pool = ThreadPoolExecutor()
-    print(f'Starting {os.path.basename(__file__)} with '
-          f'parameters file "{args.paramfile}" at {time.ctime()}\n'
-          f'DEBUG mode is {DEBUG}\nThread count is {THREADS} of '
-          f'{pool._max_workers} maximum available on this platform')
+    # Replays need only the parsing specifications - no devices, no
+    # credentials and no InfluxDB
+    if args.replay:
+        parse_specs = load_parse_specs(get_paramfiles(args))
+        if args.parse_workers > 0:
+            PARSER = parseWorkers.ParsePool(parse_specs, args.parse_workers)
+            print(f'Parsing with {args.parse_workers} worker processes')
+        replay_run(args.replay, parse_specs)
+        sys.exit('\nCompleted replay run')
+    if args.record:
+        RECORDER = outputCapture.CaptureWriter(args.record)
+        print(f'Recording command output to {args.record}')
+    if args.shard is not None:
+        SHARD = shardMap.ShardMap(*args.shard)
+        if args.shard_lease:
+            LEASE = shardMap.ShardLease(args.shard_lease, *args.shard,
+                                        ttl=args.shard_ttl)
+            print(f'Holding the lease for shard {SHARD} in '
+                  f'{args.shard_lease}')
 
-    # Run process manually first, then schedule per spec
+    print(f'Starting {os.path.basename(__file__)} with '
+          f'parameters file "{", ".join(args.paramfile)}" at '
+          f'{time.ctime()}\n'
+          f'DEBUG mode is {DEBUG}\nConcurrent session limit is '
+          f'{"adaptive, up to " if args.adaptive else ""}{CONCURRENCY}')
+    if args.threads != 1:
+        print('WARNING: -t/--threads is deprecated and ignored - use '
+              '-c/--concurrency to size collection')
+
+    # Single event loop shared by prompt learning and every poll cycle;
+    # pooled sessions must outlive a polling interval to be reused
+    if args.idle_timeout is None:
+        args.idle_timeout = 3 * FREQUENCY
+    COLLECTOR = CollectorLoop(CONCURRENCY, idle_timeout=args.idle_timeout,
+                              keepalive=args.keepalive,
+                              adaptive=args.adaptive,
+                              login_rate=args.login_rate,
+                              user_login_rate=args.user_login_rate)
+    if args.adaptive:
+        LIMITER = COLLECTOR.semaphore
+    LOGINS = COLLECTOR.logins
+
+    # Learn the devices first, then poll them on schedule
     worklist, inventory, parse_specs, influxenv, reachable_devices, \
         unreachable_devices = get_run_specs(args)
-    if len(reachable_devices) == 0:
+    # With shard leases, a collector with nothing to poll stands by to
+    # take over the devices of a collector that stops
+    if len(reachable_devices) == 0 and LEASE is None:
         sys.exit('EXITING - NO reachable devices')
+    # Reloads update parse_specs in place, so streaming sessions see them
+    PARSE_SPECS = parse_specs
+    # Parsespec changesonly / counters policies; the filter reads the
+    # live parse_specs so reloaded policies apply straight away
+    CHANGES = changeFilter.ChangeFilter(parse_specs)
+    if args.parse_workers > 0:
+        PARSER = parseWorkers.ParsePool(
+            parse_specs, args.parse_workers,
+            observer=None if TELEMETRY is None else TELEMETRY.parsed,
+            refine=CHANGES.apply)
+        print(f'Parsing with {args.parse_workers} worker processes')
         
-    # TO-DO Add some logic to handle unreachable devices being skipped
-    #   in next process...later to be added after polling cycle for retry
-    main_loop(worklist, inventory, parse_specs, influxenv)
+    if args.profile > 0:
+        profile_run(args.profile, args.profile_report, worklist, inventory,
+                    parse_specs, influxenv)
+        COLLECTOR.stop()
+        if RECORDER is not None:
+            RECORDER.close()
+        if LEASE is not None:
+            LEASE.stop()
+        sys.exit('\nCompleted profile run')
 
     # If we're running in DEBUG mode we won't schedule repeated runs
-    if DEBUG: sys.exit('\nCompleted debug run')
-
-    schedule.every(args.frequency).seconds.do(run_threaded,
-                                              main_loop,
-                                              worklist,
-                                              inventory,
-                                              parse_specs,
-                                              influxenv)
-
-    # Keep looping while scheduler is running, output incremental
-    # periods to console so user can see continued progress
+    if DEBUG:
+        main_loop(worklist, inventory, parse_specs, influxenv)
+        if RECORDER is not None:
+            RECORDER.close()
+        if LEASE is not None:
+            LEASE.stop()
+        sys.exit('\nCompleted debug run')
+
+    # Unreachable devices are out of the polling cycle until a
+    # background probe gets through to them again
+    COLLECTOR.watch(inventory)
+
+    # Keep polling, each device at its own point in the interval, until
+    # the user stops us
+    WRITE_QUEUE = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    threading.Thread(target=write_queued, name='InfluxWrite',
+                     daemon=True).start()
     try:
-        while True:
-            if FREQUENCY - schedule.idle_seconds() > 20:
-                print(f'\rNext run in {round(schedule.idle_seconds())} seconds.', end='', flush=True)
-            schedule.run_pending()
-            time.sleep(5)
-            #print(schedule.next_run())
-            #print(schedule.idle_seconds())
+        run_scheduler(args, worklist, inventory, parse_specs, influxenv)
     except KeyboardInterrupt:
         print('\nUser initiated stop - shutting down...')
+        COLLECTOR.stop()
+        if RECORDER is not None:
+            RECORDER.close()
+        if LEASE is not None:
+            LEASE.stop()
         try:
             sys.exit(0)
         except SystemExit:
@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""End-to-end throughput benchmark against simulated devices
+ (benchmark.py)
+
+Runs the SSH2Influx collection path - prompt learning, run_commands /
+_run_command over SSH, extract_matches, assemble_influx_lp and
+send_to_influx - against N simulated Cisco hosts (see mockDevices.py)
+and a local stand-in for the InfluxDB /api/v2/write endpoint, with no
+real routers or InfluxDB needed.
+
+The simulated devices run on their own event loop thread in this
+process.  They share the interpreter with the collector, so absolute
+numbers are pessimistic; compare runs made with the same settings on
+the same machine to catch regressions.
+
+Usage:
+    python benchmarks/benchmark.py [-n hosts] [--cycles cycles]
+        [--latency ms] [--output-bytes bytes] [--platform iosxe|nxos]
+        [-c concurrency] [--adaptive] [--login-rate logins]
+        [-m paced|prompt] [--pipeline depth]
+        [-i idletimeout] [-w workers] [--base-port port] [--json file]
+
+Outputs:
+    per-cycle stage timings, devices per second and latency
+    percentiles on the console; optionally the same as JSON
+
+Version log:
+v1   2026-1017  Created
+v2   2026-1017  --adaptive and --login-rate
+
+Credits:
+"""
+__version__ = '2'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import argparse
+import asyncio
+import contextlib
+import gzip
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import yaml
+
+import mockDevices
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+# Commands per platform and the examples/ parsespecs they exercise
+COMMANDS = {
+    'iosxe': [{'cmd': 'show version', 'parsespec': 301},
+              {'cmd': 'show proc cpu sorted | include IP ', 'parsespec': 201},
+              {'cmd': 'show ip traffic', 'parsespec': 302}],
+    'nxos': [{'cmd': 'show ver', 'parsespec': 102},
+             {'cmd': 'show proc cpu sorted | include IP ', 'parsespec': 201}],
+}
+SPEC_FILES = ['sample-single.yml', 'sample-multiple.yml',
+              'sample-iterative.yml']
+
+
+class _WriteHandler(BaseHTTPRequestHandler):
+    # Accepts InfluxDB v2 writes and counts what arrived
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.lines += body.count(b'\n')
+            self.server.bytes += len(body)
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_influx_stub():
+    """Local /api/v2/write stand-in on a free port"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _WriteHandler)
+    server.lock = threading.Lock()
+    server.requests = server.lines = server.bytes = 0
+    threading.Thread(target=server.serve_forever, name='InfluxStub',
+                     daemon=True).start()
+    return server
+
+
+def percentile(values, pct):
+    # Nearest-rank percentile
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def write_configs(workdir, args, influx_port):
+    # optionsconfig.yaml and a parameters file for the simulated hosts
+    parsespecs = []
+    for name in SPEC_FILES:
+        with open(os.path.join(REPO, 'examples', name)) as specfile:
+            parsespecs.extend(yaml.safe_load(specfile)['parsespecs'])
+    options = {
+        'InfluxDB': {'alias': 'benchmark', 'host': '127.0.0.1',
+                     'port': influx_port, 'protocol': 'http',
+                     'token': 'benchmark', 'org': 'benchmark',
+                     'bucket': 'benchmark'},
+        'DefaultCredentials': {'username': 'bench', 'password': 'bench'},
+        'device_inventory': [{'mgmt_hostnameip': '127.0.0.1',
+                              'port': args.base_port + index,
+                              'alias': f'bench-{index + 1}'}
+                             for index in range(args.hosts)],
+    }
+    params = {
+        'inventory': {'credential_set': 'DefaultCredentials',
+                      'hosts': [{'host': f'bench-{index + 1}'}
+                                for index in range(args.hosts)],
+                      'groupcommands': COMMANDS[args.platform]},
+        'parsespecs': parsespecs,
+    }
+    with open(os.path.join(workdir, 'optionsconfig.yaml'), 'w') as optfile:
+        yaml.safe_dump(options, optfile)
+    with open(os.path.join(workdir, 'params.yaml'), 'w') as paramfile:
+        yaml.safe_dump(params, paramfile)
+
+
+async def timed_collect(collector, targets):
+    # collect_all, keeping each device's latency
+    async def one(target):
+        began = time.perf_counter()
+        records = await target.run_commands(collector.COLLECTOR.semaphore,
+                                            collector.COLLECTOR.sessions)
+        return records, time.perf_counter() - began
+    return await asyncio.gather(*(one(target) for target in targets))
+
+
+def run_cycle(collector, targets, parse_specs, influxenv, quiet):
+    # One batch polling cycle, timed stage by stage
+    began = time.perf_counter()
+    with contextlib.redirect_stdout(quiet):
+        collected = collector.COLLECTOR.run(timed_collect(collector,
+                                                          targets))
+        results = [records for records, _ in collected if records is not None]
+        collect_done = time.perf_counter()
+        if collector.PARSER is not None:
+            measurements = collector.PARSER.extract(results)
+        else:
+            measurements = collector.extract_matches(parse_specs, results)
+        parse_done = time.perf_counter()
+        influx_lines = collector.assemble_influx_lp(measurements, time.time())
+        encode_done = time.perf_counter()
+        failed = collector.send_to_influx(influxenv, influx_lines)
+        write_done = time.perf_counter()
+    return {
+        'collect': collect_done - began,
+        'parse': parse_done - collect_done,
+        'encode': encode_done - parse_done,
+        'write': write_done - encode_done,
+        'total': write_done - began,
+        'devices': len(results),
+        'failed_devices': len(targets) - len(results),
+        'lines': influx_lines.count('\n'),
+        'failed_batches': len(failed),
+        'device_latency': [latency for records, latency in collected
+                           if records is not None],
+    }
+
+
+def summarize(cycles):
+    # Steady state leaves out the first cycle's logins when pooling
+    warm = cycles[1:] if len(cycles) > 1 else cycles
+    latencies = [latency for cycle in warm
+                 for latency in cycle['device_latency']]
+    totals = [cycle['total'] for cycle in warm]
+    collect = sum(cycle['collect'] for cycle in warm)
+    return {
+        'cycles': len(warm),
+        'devices_per_sec': (sum(cycle['devices'] for cycle in warm) /
+                            collect if collect else 0.0),
+        'cycle_p50': percentile(totals, 50),
+        'cycle_p90': percentile(totals, 90),
+        'cycle_p99': percentile(totals, 99),
+        'device_p50': percentile(latencies, 50),
+        'device_p90': percentile(latencies, 90),
+        'device_p99': percentile(latencies, 99),
+        'device_max': max(latencies, default=0.0),
+        'parse_mean': sum(cycle['parse'] for cycle in warm) / len(warm),
+        'encode_mean': sum(cycle['encode'] for cycle in warm) / len(warm),
+        'write_mean': sum(cycle['write'] for cycle in warm) / len(warm),
+    }
+
+
+def report(args, learn_time, cycles, summary, stub):
+    print(f'\nSSH2Influx benchmark - {args.hosts} simulated {args.platform} '
+          f'hosts, {args.latency:g} ms command latency, '
+          f'{args.output_bytes} byte process table\n'
+          f'command mode {args.command_mode}, pipeline {args.pipeline}, '
+          f'concurrency {args.concurrency}, idle timeout '
+          f'{args.idle_timeout}, parse workers {args.parse_workers}\n')
+    print(f'Prompt learning: {learn_time:.3f} s')
+    print(f'\n{"cycle":>5} {"collect":>9} {"parse":>9} {"encode":>9} '
+          f'{"write":>9} {"total":>9} {"dev/s":>9} {"lines":>8} '
+          f'{"failed":>6}')
+    for number, cycle in enumerate(cycles, 1):
+        rate = cycle['devices'] / cycle['collect'] if cycle['collect'] else 0
+        print(f'{number:>5} {cycle["collect"]:>9.3f} {cycle["parse"]:>9.3f} '
+              f'{cycle["encode"]:>9.3f} {cycle["write"]:>9.3f} '
+              f'{cycle["total"]:>9.3f} {rate:>9.1f} {cycle["lines"]:>8} '
+              f'{cycle["failed_devices"]:>6}')
+    print(f'\nSteady state over {summary["cycles"]} cycle(s)')
+    print(f'  Devices/sec collected    {summary["devices_per_sec"]:.1f}')
+    print(f'  Cycle latency (s)        p50 {summary["cycle_p50"]:.3f}  '
+          f'p90 {summary["cycle_p90"]:.3f}  p99 {summary["cycle_p99"]:.3f}')
+    print(f'  Device latency (ms)      p50 {summary["device_p50"] * 1000:.1f}'
+          f'  p90 {summary["device_p90"] * 1000:.1f}  '
+          f'p99 {summary["device_p99"] * 1000:.1f}  '
+          f'max {summary["device_max"] * 1000:.1f}')
+    print(f'  Parse / encode / write   {summary["parse_mean"] * 1000:.1f} / '
+          f'{summary["encode_mean"] * 1000:.1f} / '
+          f'{summary["write_mean"] * 1000:.1f} ms per cycle')
+    print(f'  InfluxDB stand-in        {stub.requests} requests, '
+          f'{stub.lines} lines, {stub.bytes} bytes')
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description='Benchmark SSH2Influx '
+                                     'against simulated devices')
+    parser.add_argument('-n', '--hosts', metavar='count', default=100,
+                        type=int, help='Simulated hosts (default of 100)')
+    parser.add_argument('--cycles', metavar='cycles', default=5, type=int,
+                        help='Polling cycles to run (default of 5)')
+    parser.add_argument('--latency', metavar='ms', default=50, type=float,
+                        help='Milliseconds before each command is answered '
+                             '(default of 50)')
+    parser.add_argument('--output-bytes', metavar='bytes', default=2000,
+                        type=int, dest='output_bytes',
+                        help='Approximate size of the process table output '
+                             '(default of 2000)')
+    parser.add_argument('--platform', default='iosxe',
+                        choices=sorted(COMMANDS),
+                        help='CLI to emulate (default of iosxe)')
+    parser.add_argument('-c', '--concurrency', metavar='concurrency',
+                        default=500, type=int,
+                        help='Maximum concurrent SSH sessions '
+                             '(default of 500)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Adapt the session limit to observed latency, '
+                             'up to -c/--concurrency')
+    parser.add_argument('--login-rate', metavar='logins', default=None,
+                        type=float, dest='login_rate',
+                        help='Most new SSH logins per second (default of no '
+                             'limit)')
+    parser.add_argument('-m', '--command-mode', metavar='commandmode',
+                        default='prompt', choices=['paced', 'prompt'],
+                        dest='command_mode',
+                        help='"paced" or "prompt" (default of prompt)')
+    parser.add_argument('--pipeline', metavar='depth', default=1, type=int,
+                        help='Commands written at once in prompt mode '
+                             '(default of 1)')
+    parser.add_argument('-i', '--idle-timeout', metavar='idletimeout',
+                        default=900, type=int, dest='idle_timeout',
+                        help='Pooled session idle timeout; 0 logs in '
+                             'fresh every cycle (default of 900)')
+    parser.add_argument('-w', '--parse-workers', metavar='workers',
+                        default=0, type=int, dest='parse_workers',
+                        help='Worker processes for parsing (default of 0)')
+    parser.add_argument('--base-port', metavar='port', default=20000,
+                        type=int, dest='base_port',
+                        help='Port of the first simulated host '
+                             '(default of 20000)')
+    parser.add_argument('--json', metavar='file', default=None,
+                        help='Also write the results to this JSON file')
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+    workdir = tempfile.mkdtemp(prefix='ssh2influx-bench-')
+    start_dir = os.getcwd()
+
+    # Simulated devices on their own event loop thread
+    device_loop = asyncio.new_event_loop()
+    threading.Thread(target=device_loop.run_forever, name='MockDevices',
+                     daemon=True).start()
+    devices, _ = asyncio.run_coroutine_threadsafe(
+        mockDevices.start_devices(args.hosts, args.base_port,
+                                  args.platform, args.latency / 1000,
+                                  args.output_bytes),
+        device_loop).result()
+    stub = start_influx_stub()
+    write_configs(workdir, args, stub.server_address[1])
+    os.chdir(workdir)
+
+    import SSH2Influx as collector
+    from common import parseWorkers
+    collector.DEBUG = False
+    collector.COMMAND_MODE = args.command_mode
+    collector.PIPELINE_DEPTH = args.pipeline
+    collector.COLLECTOR = collector.CollectorLoop(
+        args.concurrency, idle_timeout=args.idle_timeout,
+        adaptive=args.adaptive, login_rate=args.login_rate)
+    if args.adaptive:
+        collector.LIMITER = collector.COLLECTOR.semaphore
+    collector.LOGINS = collector.COLLECTOR.logins
+
+    quiet = open(os.devnull, 'w')
+    try:
+        began = time.perf_counter()
+        with contextlib.redirect_stdout(quiet):
+            worklist, inventory, parse_specs, influxenv, _, unreachable = \
+                collector.get_run_specs(argparse.Namespace(
+                    paramfile=['params.yaml'], group='device_inventory'))
+        learn_time = time.perf_counter() - began
+        collector.PARSE_SPECS = parse_specs
+        if unreachable:
+            print(f'WARNING: {len(unreachable)} simulated hosts unreachable')
+        if args.parse_workers > 0:
+            collector.PARSER = parseWorkers.ParsePool(parse_specs,
+                                                      args.parse_workers)
+        targets = [inventory[item['hostalias']] for item in worklist]
+        cycles = []
+        for number in range(args.cycles):
+            cycles.append(run_cycle(collector, targets, parse_specs,
+                                    influxenv, quiet))
+            limit = '' if collector.LIMITER is None else \
+                f' - concurrency limit {collector.LIMITER.limit}'
+            print(f'Cycle {number + 1} of {args.cycles} - '
+                  f'{cycles[-1]["total"]:.3f} s{limit}', flush=True)
+        summary = summarize(cycles)
+        report(args, learn_time, cycles, summary, stub)
+        if args.json:
+            for cycle in cycles:
+                cycle['device_latency_p50'] = percentile(
+                    cycle.pop('device_latency'), 50)
+            with open(os.path.join(start_dir, args.json), 'w') as jsonfile:
+                json.dump({'settings': vars(args),
+                           'learn_time': learn_time,
+                           'cycles': cycles,
+                           'summary': summary,
+                           'device_sessions': sum(device.sessions
+                                                  for device in devices)},
+                          jsonfile, indent=1)
+    finally:
+        if collector.PARSER is not None:
+            collector.PARSER.close()
+        collector.COLLECTOR.stop()
+        os.chdir(start_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+        quiet.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Simulated Cisco devices for benchmarking without real routers
+ (mockDevices.py)
+
+Starts one asyncssh server per simulated host on 127.0.0.1, each on its
+own port, that behaves enough like the IOS-XE or NX-OS CLI for
+SSH2Influx - an SSH server version the collector recognizes, a login
+banner, a "hostname#" prompt, 'terminal length 0' and canned output for
+the commands used by the parsespecs in examples/.  Every command reply
+is delayed by a configurable latency, and the process table output is
+padded with rows to a configurable size.
+
+Logins accept any username and password.
+
+Required inputs/variables:
+    count - number of simulated hosts
+    base_port - port of the first host; host N listens on base_port + N
+
+Outputs:
+    running SSH servers, on the event loop they were started from
+
+Run on its own to serve devices for a separately started SSH2Influx:
+    python benchmarks/mockDevices.py -n 100 --base-port 20000
+
+Version log:
+v1   2026-1017  Created for the benchmark suite
+
+Credits:
+"""
+__version__ = '1'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import argparse
+import asyncio
+import asyncssh
+
+# SSH server versions the collector sees for each platform
+SERVER_VERSIONS = {'iosxe': 'Cisco-1.25', 'nxos': 'OpenSSH_8.3'}
+
+BANNER = ('\r\n'
+          'User Access Verification\r\n'
+          '\r\n'
+          'Simulated device for SSH2Influx benchmarking\r\n'
+          '\r\n')
+
+PROCESS_ROW = (' {pid:4d}     {runtime:8d}   {invoked:7d}      {usecs:3d}  '
+               '{sec5:.2f}%  {min1:.2f}%  {min5:.2f}%   0 IP {name}\r\n')
+
+
+def show_version(hostname, platform):
+    if platform == 'nxos':
+        return (f'Cisco Nexus Operating System (NX-OS) Software\r\n'
+                f'  NXOS: version 9.3(3)\r\n'
+                f'Kernel uptime is 12 day(s), 3 hour(s), 44 minute(s), '
+                f'21 second(s)\r\n'
+                f'Last reset\r\n'
+                f'  Reason: Unknown\r\n')
+    return (f'Cisco IOS XE Software, Version 17.09.04a\r\n'
+            f'{hostname} uptime is 1 week, 2 days, 3 hours, 4 minutes\r\n'
+            f'Uptime for this control processor is 1 week, 2 days, 3 hours, '
+            f'5 minutes\r\n'
+            f'System returned to ROM by Reload Command\r\n'
+            f'Last reload reason: Reload Command\r\n')
+
+
+def show_proc_cpu(output_bytes):
+    # Process table rows, at least two, to about output_bytes of output
+    rows = []
+    size = 0
+    pid = 1
+    while len(rows) < 2 or size < output_bytes:
+        row = PROCESS_ROW.format(pid=pid, runtime=pid * 1031,
+                                 invoked=pid * 37, usecs=pid % 1000,
+                                 sec5=pid % 7 / 10, min1=pid % 5 / 10,
+                                 min5=pid % 3 / 10,
+                                 name=f'Input {pid}')
+        rows.append(row)
+        size += len(row)
+        pid += 1
+    return ''.join(rows)
+
+
+def show_ip_traffic():
+    return ('IP statistics:\r\n'
+            '  Rcvd:  4063 total, 2151 local destination\r\n'
+            '         0 format errors, 0 checksum errors, 0 bad hop count\r\n'
+            'ICMP statistics:\r\n'
+            '  Rcvd: 0 format errors, 1 checksum errors, 0 redirects\r\n'
+            'UDP statistics:\r\n'
+            '  Rcvd: 1211 total, 2 checksum errors, 1205 no port\r\n'
+            'OSPF statistics:\r\n'
+            '  Rcvd: 0 total, 3 checksum errors\r\n'
+            'TCP statistics:\r\n'
+            '  Rcvd: 1920 total, 4 checksum errors, 0 no port\r\n'
+            'IGMP statistics: Sent/Received\r\n'
+            '  Total: 0/0, Format errors: 0/0, Checksum errors: 5/5\r\n')
+
+
+class MockDevice:
+    """One simulated host
+
+    :param hostname: device hostname, shown in its prompt
+    :param platform: 'iosxe' or 'nxos'
+    :param latency: seconds before each command is answered
+    :param output_bytes: approximate size of the process table output
+    """
+    def __init__(self, hostname, platform='iosxe', latency=0.05,
+                 output_bytes=2000):
+        self.hostname = hostname
+        self.platform = platform
+        self.latency = latency
+        self.prompt = f'{hostname}#'
+        version = show_version(hostname, platform)
+        self.outputs = {
+            'terminal length 0': '',
+            'show version': version,
+            'show ver': version,
+            'show proc cpu sorted | include IP ': show_proc_cpu(output_bytes),
+            'show ip traffic': show_ip_traffic(),
+        }
+        self.sessions = 0
+        self.commands = 0
+
+    def reply(self, command):
+        if not command:
+            return ''
+        output = self.outputs.get(command)
+        if output is None:
+            return ("                    ^\r\n"
+                    "% Invalid input detected at '^' marker.\r\n\r\n")
+        return output
+
+    async def handle(self, process):
+        self.sessions += 1
+        process.stdout.write(BANNER + self.prompt)
+        try:
+            while True:
+                line = await process.stdin.readline()
+                if not line:
+                    break
+                command = line.rstrip('\r\n')
+                if command:
+                    self.commands += 1
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                # Echo the command as a terminal would, then the reply
+                process.stdout.write(f'{command}\r\n{self.reply(command)}'
+                                     f'{self.prompt}')
+        except (asyncssh.Error, OSError):
+            pass
+        process.exit(0)
+
+
+class _Server(asyncssh.SSHServer):
+    def begin_auth(self, username):
+        return True
+
+    def password_auth_supported(self):
+        return True
+
+    def validate_password(self, username, password):
+        return True
+
+
+async def start_devices(count, base_port=20000, platform='iosxe',
+                        latency=0.05, output_bytes=2000):
+    """Start count simulated hosts on the running event loop
+
+    :returns: (list of MockDevice, list of asyncssh servers)
+    """
+    key = asyncssh.generate_private_key('ssh-ed25519')
+    devices = []
+    servers = []
+    for index in range(count):
+        device = MockDevice(f'bench-{index + 1}', platform, latency,
+                            output_bytes)
+        server = await asyncssh.create_server(
+            _Server, '127.0.0.1', base_port + index,
+            server_host_keys=[key],
+            server_version=SERVER_VERSIONS[platform],
+            process_factory=device.handle)
+        devices.append(device)
+        servers.append(server)
+    return devices, servers
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description='Serve simulated Cisco '
+                                     'devices over SSH')
+    parser.add_argument('-n', '--hosts', metavar='count', default=10,
+                        type=int, help='Simulated hosts (default of 10)')
+    parser.add_argument('--base-port', metavar='port', default=20000,
+                        type=int, dest='base_port',
+                        help='Port of the first host (default of 20000)')
+    parser.add_argument('--platform', default='iosxe',
+                        choices=sorted(SERVER_VERSIONS),
+                        help='CLI to emulate (default of iosxe)')
+    parser.add_argument('--latency', metavar='ms', default=50, type=float,
+                        help='Milliseconds before each command is answered '
+                             '(default of 50)')
+    parser.add_argument('--output-bytes', metavar='bytes', default=2000,
+                        type=int, dest='output_bytes',
+                        help='Approximate size of the process table output '
+                             '(default of 2000)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = get_arguments()
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(start_devices(args.hosts, args.base_port,
+                                          args.platform,
+                                          args.latency / 1000,
+                                          args.output_bytes))
+    print(f'Serving {args.hosts} simulated {args.platform} hosts on '
+          f'127.0.0.1 ports {args.base_port}-'
+          f'{args.base_port + args.hosts - 1}')
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Drops unchanged points and derives counter deltas and rates
+ (changeFilter.py)
+
+Some measurements hardly ever change - hostname, uptime string, reload
+reason - yet are written every poll.  A parsespec can opt in to writing
+only points whose fields changed since they were last written, with a
+heartbeat that still writes every Nth poll so the series never goes
+quiet in InfluxDB.  A parsespec can also name counter fields to be
+written again as a per-poll delta or per-second rate, computed here
+from the previous poll of the same series.
+
+    parsespecs:
+      - parsespec: 301
+        measurement: platform-version
+        changesonly: true      # skip points whose fields are unchanged
+        heartbeat: 12          # ...but write every 12th poll regardless
+        counters:              # extra <name>_delta / <name>_rate fields
+          - countername: IPstats-checksumerr-rx
+            countertype: rate
+
+The last written fields of every series are held in memory, keyed by
+parsespec, device, measurement and tags.
+
+Required inputs/variables:
+    parsespecs - dictionary of compiled ParseSpec objects (see
+        parseSpecs.py), looked up live so reloads take effect
+
+Outputs:
+    measurements to write, in the ParseSpec.extract() form
+
+Version log:
+v1   2026-1017  Created
+
+Credits:
+"""
+__version__ = '1'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import threading
+import time
+
+
+def _number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+
+class ChangeFilter:
+    """Per-series memory of written fields and counter values
+
+    :param parsespecs: dictionary of compiled ParseSpec objects by id
+    :param max_series: series remembered before the memory is reset
+    """
+    def __init__(self, parsespecs, max_series=1_000_000):
+        self.parsespecs = parsespecs
+        self.max_series = max_series
+        self._series = {}
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def apply(self, parsespec_id, measurements):
+        """Filter and extend the measurements one output produced
+
+        :param parsespec_id: id of the parsespec that produced them
+        :param measurements: list of measurements
+        :returns: list of measurements to write
+        """
+        parsespec = self.parsespecs.get(parsespec_id)
+        if parsespec is None or not (parsespec.changesonly or
+                                     parsespec.counters):
+            return measurements
+        now = time.monotonic()
+        kept = []
+        with self._lock:
+            if len(self._series) >= self.max_series:
+                self._series.clear()
+            for item in measurements:
+                item = self._apply_one(parsespec, item, now)
+                if item is not None:
+                    kept.append(item)
+        return kept
+
+    def _apply_one(self, parsespec, item, now):
+        tags = tuple((entry[0], entry[3]) for entry in item[2:]
+                     if entry[1] == 'tag')
+        fields = tuple((entry[0], entry[3]) for entry in item[2:]
+                       if entry[1] == 'field')
+        key = (parsespec.id, item[0], item[1], tags)
+        state = self._series.get(key)
+        if state is None:
+            # [fields last written, polls since then, counters, when]
+            state = self._series[key] = [None, 0, {}, None]
+
+        if parsespec.counters:
+            item = list(item)
+            previous, then = state[2], state[3]
+            for name, keytype, valuetype, value in item[2:]:
+                mode = parsespec.counters.get(name)
+                if keytype != 'field' or mode is None:
+                    continue
+                current = _number(value)
+                last = previous.get(name)
+                previous[name] = current
+                if current is None or last is None or current < last:
+                    # First poll, not a number, or the counter was reset
+                    continue
+                if mode == 'delta':
+                    item.append((f'{name}_delta', 'field', valuetype,
+                                 current - last))
+                elif now > then:
+                    item.append((f'{name}_rate', 'field', 'decimal',
+                                 (current - last) / (now - then)))
+            state[3] = now
+
+        if parsespec.changesonly:
+            state[1] += 1
+            if fields == state[0] and state[1] < parsespec.heartbeat:
+                self.suppressed += 1
+                return None
+            state[0] = fields
+            state[1] = 0
+        return item
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tracks device health and when to retry unreachable devices
+ (deviceHealth.py)
+
+Every device moves between three states -
+
+    healthy   the last collection worked
+    degraded  recent collections failed, but fewer than down_after in
+              a row; the device is still polled every cycle
+    down      down_after or more failures in a row; the device is taken
+              out of the polling cycle and only re-probed, with
+              exponential backoff plus jitter between probes
+
+A successful probe or collection returns the device to healthy.
+
+Required inputs/variables:
+    none - one DeviceHealth per device, updated with success() and
+        failure() as collections and probes finish
+
+Outputs:
+    polling() / probe_due() answers for the collection cycle
+
+Version log:
+v1   2026-1017  Created to retry unreachable devices automatically
+
+Credits:
+"""
+__version__ = '1'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import random
+import time
+
+HEALTHY = 'healthy'
+DEGRADED = 'degraded'
+DOWN = 'down'
+
+
+class DeviceHealth:
+    """Health state machine for one device
+
+    :param down_after: consecutive failures before the device is down
+    :param base_backoff: seconds before the first re-probe of a down
+      device; doubles with every failed probe
+    :param max_backoff: longest wait between probes
+    """
+    def __init__(self, down_after=3, base_backoff=30, max_backoff=3600):
+        self.down_after = max(down_after, 1)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = HEALTHY
+        self.failures = 0
+        self.next_probe = 0.0
+        self.probing = False
+
+    def __repr__(self):
+        return f'<DeviceHealth {self.state} failures={self.failures}>'
+
+    def success(self):
+        """Record a good collection or probe; returns the old state"""
+        previous = self.state
+        self.state = HEALTHY
+        self.failures = 0
+        self.next_probe = 0.0
+        return previous
+
+    def failure(self):
+        """Record a failed collection or probe; returns the new state"""
+        self.failures += 1
+        if self.failures < self.down_after:
+            self.state = DEGRADED
+            return self.state
+        self.state = DOWN
+        # Equal jitter - somewhere in the second half of the backoff -
+        # keeps a group of devices that failed together from being
+        # re-probed together, without any being re-probed at once
+        backoff = min(self.base_backoff *
+                      2 ** (self.failures - self.down_after),
+                      self.max_backoff)
+        self.next_probe = time.monotonic() + random.uniform(backoff / 2,
+                                                            backoff)
+        return self.state
+
+    def mark_down(self):
+        """Treat the device as down now, e.g. it failed at startup"""
+        self.failures = max(self.failures, self.down_after - 1)
+        return self.failure()
+
+    def polling(self):
+        """Whether the device belongs in the polling cycle"""
+        return self.state != DOWN
+
+    def probe_due(self):
+        """Whether a down device is due for a re-probe"""
+        return (self.state == DOWN and not self.probing and
+                time.monotonic() >= self.next_probe)
+
+    def retry_in(self):
+        """Seconds until the next probe of a down device"""
+        return max(self.next_probe - time.monotonic(), 0)
@@ -33,29 +33,64 @@ v1   2021-0623  Created as normalized function across all
 v2   2023-0503  Updated to reduce module and function names
     DevNet Dashboard importing scripts
 v3   2023-0725  Update to new naming convention
+v4   2026-1017  Parse each YAML file once, re-reading only when its
+    modification time changes
 
 Credits:
 """
-__version__ = '3'
+__version__ = '4'
 __author__ = 'Jason Davis - jadavis@cisco.com'
 __license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
 
 
-def getparam(parameter):
-    """Read environmental settings file
-    
-    Reads a YAML file that defines environmental parameter and settings
+import copy
+import os
 
-    :param parameter: string defining the type of parameter setting(s) 
-      to extract [eg. Webex_Key, PrimeInfrastructure, DNACenter, etc.]
-    :returns: List of servertype entries defined in YAML config file
+# Parsed YAML documents keyed by filename - (mtime, document)
+_cache = {}
+
+
+def filestamp(filename):
+    """Modification stamp of a file, to tell when it has changed"""
+    return os.stat(filename).st_mtime_ns
+
+
+def loadyaml(filename):
+    """Read a YAML file, parsing it again only when it has changed
+
+    If a changed file no longer parses (for example it is being saved
+    while we read it) the last good version is kept.
+
+    :param filename: YAML file to read
+    :returns: parsed YAML document (shared - do not modify)
     """
     import yaml
 
-    with open("optionsconfig.yaml", "r") as ymlfile:
+    mtime = filestamp(filename)
+    cached = _cache.get(filename)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(filename, "r") as ymlfile:
         try:
             cfg = yaml.safe_load(ymlfile)
         except yaml.YAMLError as e:
             print(e)
+            if cached is None:
+                raise
+            return cached[1]
+    _cache[filename] = (mtime, cfg)
+    return cfg
+
+
+def getparam(parameter):
+    """Read environmental settings file
     
-    return cfg.get(parameter)
\ No newline at end of file
+    Reads a YAML file that defines environmental parameter and settings
+
+    :param parameter: string defining the type of parameter setting(s) 
+      to extract [eg. Webex_Key, PrimeInfrastructure, DNACenter, etc.]
+    :returns: List of servertype entries defined in YAML config file
+    """
+    cfg = loadyaml("optionsconfig.yaml")
+    # Callers get their own copy so the cached document stays intact
+    return copy.deepcopy(cfg.get(parameter))
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Writes line protocol to InfluxDB in batches
+ (influxWriter.py)
+
+Line protocol for a polling cycle is split into batches by line count
+and size, gzip compressed and POSTed to the InfluxDB v2 write API over
+keep-alive HTTP sessions.  Several batches can be in flight at once.
+Every request has connect/read timeouts, and batches that get a 429 or
+5xx response (or a connection error) are retried with exponential
+backoff, honouring any Retry-After header from the server up to the
+longest backoff; a server asking for a longer wait is not retried.
+
+Writer settings are optional keys on the InfluxDB entry in
+optionsconfig.yaml (defaults shown)
+    InfluxDB:
+      ...
+      batch_lines: 5000        # most lines in one write
+      batch_bytes: 5000000     # most uncompressed bytes in one write
+      write_concurrency: 4     # batches in flight at the same time
+      connect_timeout: 5       # seconds
+      write_timeout: 30        # seconds to wait for a response
+      retries: 5               # attempts after the first
+      gzip: true
+
+Required inputs/variables:
+    influxenv - dictionary of Influx server parameters - protocol,
+        host, port, bucket, org and API token for writing
+
+Outputs:
+    batches that could not be written yet, and batches InfluxDB
+    rejected for good (bad data, auth or bucket)
+
+Version log:
+v1   2026-1017  Created to replace the single unbatched POST in
+    send_to_influx
+v2   2026-1017  write() returns rejected batches apart from retryable ones
+v3   2026-1017  Retry-After waits longer than the longest backoff not kept
+
+Credits:
+"""
+__version__ = '3'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import email.utils
+import gzip
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Outcomes of posting one batch
+WRITTEN, RETRY, REJECTED = 'written', 'retry', 'rejected'
+
+
+def split_batches(lines, batch_lines=5000, batch_bytes=5_000_000):
+    """Split line protocol text into batches on line boundaries
+
+    :param lines: newline separated line protocol
+    :param batch_lines: most lines per batch
+    :param batch_bytes: most characters per batch (a single longer
+      line still becomes its own batch)
+    :returns: list of line protocol strings
+    """
+    batches = []
+    current = []
+    size = 0
+    for line in lines.splitlines(keepends=True):
+        if current and (len(current) >= batch_lines or
+                        size + len(line) > batch_bytes):
+            batches.append(''.join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += len(line)
+    if current:
+        batches.append(''.join(current))
+    return batches
+
+
+def retry_after(response):
+    """Seconds the server asked us to wait, or None"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0)
+
+
+class InfluxWriter:
+    """Batched, compressed, keep-alive writer for one InfluxDB target
+
+    :param influxenv: Influx server parameters from optionsconfig.yaml
+    :param precision: timestamp precision of the line protocol
+    """
+    def __init__(self, influxenv, precision='s'):
+        self.alias = influxenv.get('alias', influxenv['host'])
+        self.url = (f'{influxenv["protocol"]}://'
+                    f'{influxenv["host"]}:{influxenv["port"]}'
+                    f'/api/v2/write')
+        self.params = {'bucket': influxenv['bucket'],
+                       'org': influxenv['org'],
+                       'precision': precision}
+        self.headers = {
+            'Accept': 'application/json',
+            'Authorization': 'Token ' + influxenv['token'],
+            'Content-Type': 'text/plain; charset=utf-8'
+        }
+        self.batch_lines = int(influxenv.get('batch_lines', 5000))
+        self.batch_bytes = int(influxenv.get('batch_bytes', 5_000_000))
+        self.concurrency = int(influxenv.get('write_concurrency', 4))
+        self.timeout = (float(influxenv.get('connect_timeout', 5)),
+                        float(influxenv.get('write_timeout', 30)))
+        self.retries = int(influxenv.get('retries', 5))
+        self.gzip = bool(influxenv.get('gzip', True))
+        if self.gzip:
+            self.headers['Content-Encoding'] = 'gzip'
+        self.backoff = 1.0
+        self.max_backoff = 60.0
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency,
+            thread_name_prefix=f'InfluxWrite-{self.alias}')
+
+    def _session(self):
+        # One keep-alive session per writer thread
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
+
+    def _post(self, batch):
+        # Send one batch, retrying when the server or network asks us to;
+        # returns WRITTEN, RETRY when it may be accepted later, or
+        # REJECTED when it never will be
+        data = batch.encode('utf-8')
+        if self.gzip:
+            data = gzip.compress(data, compresslevel=5)
+        for attempt in range(self.retries + 1):
+            wait = None
+            try:
+                response = self._session().post(self.url,
+                                                 params=self.params,
+                                                 data=data,
+                                                 timeout=self.timeout)
+                if response.status_code < 300:
+                    return WRITTEN
+                if response.status_code not in RETRY_STATUS:
+                    # Bad data, auth or bucket - retrying will not help
+                    print(f'Http Error: {response.status_code} - '
+                          f'{response.reason} - {response.text}')
+                    return REJECTED
+                wait = retry_after(response)
+                print(f'InfluxDB {self.alias} busy ({response.status_code}'
+                      f' - {response.reason}), attempt {attempt + 1}')
+                if wait is not None and wait > self.max_backoff:
+                    # Not worth holding a writer thread that long - the
+                    # batch goes to the spool, if there is one, instead
+                    print(f'InfluxDB {self.alias} asked for a {wait:.0f}s '
+                          f'wait - giving up on the batch for now')
+                    return RETRY
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as err:
+                print(f'Error writing to InfluxDB {self.alias}, attempt '
+                      f'{attempt + 1}: {err}')
+            except requests.exceptions.RequestException as err:
+                print("Oops: Something Else", err)
+                return REJECTED
+            if attempt == self.retries:
+                break
+            if wait is None:
+                wait = min(self.backoff * 2 ** attempt, self.max_backoff)
+                wait = random.uniform(wait / 2, wait)
+            logging.debug('Retrying write to %s in %.1fs', self.alias, wait)
+            time.sleep(wait)
+        return RETRY
+
+    def write(self, lines):
+        """Write line protocol, blocking until every batch is finished
+
+        :param lines: newline separated line protocol
+        :returns: (failed, rejected) - lists of the batches InfluxDB did
+          not accept but may later, and of those it never will
+        """
+        batches = split_batches(lines, self.batch_lines, self.batch_bytes)
+        if not batches:
+            return [], []
+        results = list(self._executor.map(self._post, batches))
+        failed = [batch for batch, result in zip(batches, results)
+                  if result == RETRY]
+        rejected = [batch for batch, result in zip(batches, results)
+                    if result == REJECTED]
+        logging.debug('Wrote %d of %d batches to %s',
+                      len(batches) - len(failed) - len(rejected),
+                      len(batches), self.alias)
+        return failed, rejected
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Paces logins and finds the collection concurrency a network takes
+ (loadControl.py)
+
+A fixed -c/--concurrency has to be chosen by hand.  Too low and polling
+intervals overrun; too high and hundreds of simultaneous logins set off
+AAA lockouts and device CPU alarms.
+
+LoginLimiter passes new SSH logins through token buckets - one for the
+whole collector and one per login username - so a burst of polls (a
+restart, a site coming back) becomes a steady stream of logins.
+
+AdaptiveLimit is used in place of the collector's concurrency
+semaphore.  It is told how long each connect and command took compared
+with that device's usual time for it, and about each timeout.  When the
+median slowdown or the share of timeouts crosses its threshold, the limit
+is cut by a quarter.  While devices are queueing for a slot it grows:
+doubling at first, then by 5% at a time.  The limit settles where
+devices start to slow down, below the -c/--concurrency ceiling.
+
+Required inputs/variables:
+    rates - logins per second, for LoginLimiter
+    maximum - ceiling on concurrent sessions, for AdaptiveLimit
+
+Outputs:
+    none - both are awaited on the collector event loop
+
+Version log:
+v1   2026-1017  Created
+
+Credits:
+"""
+__version__ = '1'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import asyncio
+import collections
+import logging
+import time
+
+
+class TokenBucket:
+    """rate events per second on average, burst at most at once
+
+    Must be created and used from the collector event loop.
+
+    :param rate: tokens added per second
+    :param burst: most tokens held (default of one second's worth)
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        # Waiters are served in arrival order
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    async def take(self):
+        """Wait for a token and use it"""
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class LoginLimiter:
+    """Token buckets for SSH logins, collector-wide and per username
+
+    :param rate: logins per second across all devices (None for no limit)
+    :param user_rate: logins per second with any one username (None for
+      no limit)
+    """
+    def __init__(self, rate=None, user_rate=None):
+        self.user_rate = user_rate
+        self.bucket = None if rate is None else TokenBucket(rate)
+        self.users = {}
+        self.waits = 0
+
+    async def wait(self, username):
+        """Wait until a login with username may start"""
+        began = time.monotonic()
+        if self.user_rate is not None:
+            bucket = self.users.get(username)
+            if bucket is None:
+                bucket = self.users[username] = TokenBucket(self.user_rate)
+            await bucket.take()
+        # The user's bucket first, so a throttled username does not hold
+        # up the collector-wide bucket
+        if self.bucket is not None:
+            await self.bucket.take()
+        if time.monotonic() - began > 0.001:
+            self.waits += 1
+
+
+class AdaptiveLimit:
+    """Concurrency limit that follows observed latency and timeouts,
+    used like asyncio.Semaphore (async with limit: ...)
+
+    Must be created and used from the collector event loop.
+
+    :param maximum: most concurrent holders
+    :param initial: starting limit (default of a tenth of maximum)
+    :param minimum: fewest concurrent holders
+    :param window: observations per adjustment
+    :param tolerance: median slowdown (observed / usual time) above
+      which the limit is cut
+    :param max_timeouts: share of observations that are timeouts above
+      which the limit is cut
+    :param backoff: factor the limit is cut by
+    """
+    def __init__(self, maximum, initial=None, minimum=1, window=20,
+                 tolerance=1.5, max_timeouts=0.05, backoff=0.75):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = min(maximum, initial or max(maximum // 10, minimum))
+        self.window = window
+        self.tolerance = tolerance
+        self.max_timeouts = max_timeouts
+        self.backoff = backoff
+        self.inflight = 0
+        self.cuts = 0
+        self.raises = 0
+        self._waiters = collections.deque()
+        self._slowdowns = []
+        self._timeouts = 0
+        self._queued = False
+        self._slow_start = True
+
+    def locked(self):
+        return self.inflight >= self.limit
+
+    async def __aenter__(self):
+        if self.inflight < self.limit and not self._waiters:
+            self.inflight += 1
+            return
+        self._queued = True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Given a slot just as it was cancelled - pass it on
+                self.inflight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        self.inflight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.inflight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
+
+    def observe(self, slowdown):
+        """A connect or command took slowdown times its usual time"""
+        self._slowdowns.append(slowdown)
+        self._adjust()
+
+    def timed_out(self):
+        """A connect or command timed out, or its connection was lost"""
+        self._timeouts += 1
+        self._adjust()
+
+    def _adjust(self):
+        count = len(self._slowdowns) + self._timeouts
+        if count < self.window:
+            return
+        slowdowns = sorted(self._slowdowns)
+        median = slowdowns[len(slowdowns) // 2] if slowdowns else 0
+        timeouts = self._timeouts / count
+        previous = self.limit
+        if timeouts > self.max_timeouts or median > self.tolerance:
+            self.limit = max(self.minimum, int(self.limit * self.backoff))
+            self._slow_start = False
+            self.cuts += 1
+        elif self._queued or self._waiters:
+            step = self.limit if self._slow_start \
+                else max(1, self.limit // 20)
+            self.limit = min(self.maximum, self.limit + step)
+            self.raises += 1
+        if self.limit != previous:
+            logging.debug('Concurrency limit %d -> %d (median slowdown '
+                          '%.2f, timeouts %.0f%%)', previous, self.limit,
+                          median, timeouts * 100)
+        self._slowdowns = []
+        self._timeouts = 0
+        self._queued = False
+        self._wake()
+
+    def report(self):
+        """One line summary of the limit and its changes"""
+        return (f'{self.limit} of up to {self.maximum} sessions, '
+                f'{self.inflight} in use, {len(self._waiters)} waiting, '
+                f'{self.raises} raised, {self.cuts} cut')
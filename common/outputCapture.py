@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Records raw command output to disk and reads it back for replay
+ (outputCapture.py)
+
+With --record, every device poll's (alias, command, parsespec, output)
+records are appended to segment files in a capture directory, exactly
+as run_commands returned them.  With --replay, the same records are fed
+back through parsing and line protocol encoding with no SSH at all - to
+tune parsespecs against real production output, measure parse
+throughput, or run regressions offline.
+
+Segments are binary files.  Each starts with a magic header and holds
+one frame per device poll:
+
+    <collection time: float64> <compressed length: uint32>
+    <zlib compressed JSON list of records>
+
+Frames are compressed one at a time so a reader can memory map a
+segment and decompress frame by frame without loading the whole file,
+and a segment cut short by a crash is readable up to its last complete
+frame.  The segment being written is named <sequence>.cap.open and is
+sealed (renamed to <sequence>.cap) when it reaches its size limit or
+the recorder is closed.
+
+Required inputs/variables:
+    directory - capture directory
+
+Outputs:
+    segment files, and (collection time, records) from read_captures()
+
+Version log:
+v1   2026-1017  Created for --record and --replay
+
+Credits:
+"""
+__version__ = '1'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b'SSH2INFLUX-CAPTURE-1\n'
+FRAME = struct.Struct('<dI')
+SEALED = '.cap'
+OPEN = '.cap.open'
+
+
+class CaptureWriter:
+    """Appends device polls to compressed capture segments
+
+    :param directory: capture directory, created if needed
+    :param segment_bytes: size at which a segment is sealed
+    :param level: zlib compression level
+    """
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, level=6):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.level = level
+        self._lock = threading.Lock()
+        self._segment = None
+        self._path = None
+        self.frames = 0
+        os.makedirs(directory, exist_ok=True)
+        # A segment left open by an earlier run is complete up to its
+        # last whole frame
+        for name in os.listdir(directory):
+            if name.endswith(OPEN):
+                path = os.path.join(directory, name)
+                os.replace(path, path[:-len(OPEN)] + SEALED)
+
+    def _next_sequence(self):
+        names = [name for name in os.listdir(self.directory)
+                 if name.endswith(SEALED) or name.endswith(OPEN)]
+        last = max((int(name.split('.')[0]) for name in names), default=0)
+        return max(last + 1, int(time.time() * 1000))
+
+    def _seal(self):
+        if self._segment is not None:
+            self._segment.close()
+            os.replace(self._path, self._path[:-len(OPEN)] + SEALED)
+            self._segment = None
+            self._path = None
+
+    def record(self, records, collected=None):
+        """Append one device poll
+
+        :param records: list of (alias, command, parsespec, output)
+        :param collected: collection time (default of now)
+        """
+        payload = zlib.compress(
+            json.dumps(records, separators=(',', ':')).encode('utf-8'),
+            self.level)
+        frame = FRAME.pack(time.time() if collected is None else collected,
+                           len(payload))
+        with self._lock:
+            if self._segment is None:
+                self._path = os.path.join(
+                    self.directory, f'{self._next_sequence():015d}{OPEN}')
+                self._segment = open(self._path, 'wb')
+                self._segment.write(MAGIC)
+            self._segment.write(frame)
+            self._segment.write(payload)
+            # Whole frames reach the disk as they are recorded
+            self._segment.flush()
+            self.frames += 1
+            if self._segment.tell() >= self.segment_bytes:
+                self._seal()
+
+    def close(self):
+        with self._lock:
+            self._seal()
+
+
+def _read_segment(path):
+    # Frames of one segment, decompressed one at a time from a memory map
+    with open(path, 'rb') as segment:
+        if os.fstat(segment.fileno()).st_size <= len(MAGIC):
+            return
+        with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            if view[:len(MAGIC)] != MAGIC:
+                print(f'WARNING: {path} is not a capture segment - '
+                      f'skipping')
+                return
+            offset = len(MAGIC)
+            while offset + FRAME.size <= len(view):
+                collected, length = FRAME.unpack_from(view, offset)
+                offset += FRAME.size
+                if offset + length > len(view):
+                    logging.debug('%s ends in a partial frame', path)
+                    return
+                records = json.loads(zlib.decompress(
+                    view[offset:offset + length]))
+                offset += length
+                yield collected, records
+
+
+def read_captures(directory):
+    """Every recorded device poll in a capture directory, oldest first
+
+    :param directory: capture directory
+    :returns: generator of (collection time, records), where records is
+      a list of [alias, command, parsespec, output]
+    """
+    names = sorted(name for name in os.listdir(directory)
+                   if name.endswith(SEALED) or name.endswith(OPEN))
+    for name in names:
+        yield from _read_segment(os.path.join(directory, name))
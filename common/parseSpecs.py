@@ -0,0 +1,423 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compiles parameters file parsing specifications for fast matching
+ (parseSpecs.py)
+
+The parsespecs branch of a parameters file is read once at startup and
+turned into ParseSpec objects.  Each one holds its pre-compiled regex
+pattern(s) and a table mapping every capture group to its Influx
+(name, keytype, valuetype), so matching command output needs no
+regex compilation, spec searching or key-name building per output.
+
+The table matchtype has no regex for its rows - it locates the header
+line by its column titles and splits each following row into those
+columns in a single linear pass, for large columnar output.
+
+Specs with streaming: true (multiple and table only) are parsed while
+their output is still being read - blocks of complete lines go to an
+OutputStream and the collected record carries a StreamedOutput of the
+measurements instead of the output text.
+
+Required inputs/variables:
+    parsespecs - list of parsespec dictionaries from the parameters
+        YAML file (see examples/*.yml)
+
+Outputs:
+    dictionary of ParseSpec objects keyed by parsespec id; each
+    ParseSpec.extract() returns measurements in the form
+    [device, measurement, (name, keytype, valuetype, value), ...]
+
+Version log:
+v1   2026-1017  Created to replace per-output regex compiles and eval()
+v2   2026-1017  changesonly, heartbeat and counters options (see
+    changeFilter.py)
+v3   2026-1017  table matchtype for columnar output
+v4   2026-1017  streaming option - multiple and table output parsed
+    incrementally as it is read
+v5   2026-1017  Streamed output text can be kept, for --record
+
+Credits:
+"""
+__version__ = '5'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import bisect
+import itertools
+import logging
+import re
+
+REGEX_FLAGS = re.S | re.M
+COUNTER_TYPES = ('delta', 'rate')
+DEFAULT_HEARTBEAT = 10
+# Table rows that only underline or frame the header
+_RULE = re.compile(r'[\s\-=+|*]*$')
+_TOKEN = re.compile(r'\S+')
+
+
+def _overlap(span, start, end):
+    # Characters shared by a header column span and a row word
+    return min(end, span[1]) - max(start, span[0])
+
+
+class ParseSpec:
+    """One compiled parsing specification
+
+    :param spec: parsespec dictionary from the parameters file
+    :raises ValueError: if the spec is incomplete or its regex is invalid
+    """
+    def __init__(self, spec):
+        try:
+            self.id = spec['parsespec']
+            self.measurement = spec['measurement']
+            self.matchtype = spec['matchtype']
+        except KeyError as e:
+            raise ValueError(f'parsespec is missing {e}: {spec}')
+        # The original definition, e.g. for compiling again in a worker
+        self.spec = spec
+        self.statictags = [(tag.get('tagname'), 'tag', 'string',
+                            tag.get('tagvalue'))
+                           for tag in spec.get('statictags') or []]
+        self._policy(spec)
+
+        if self.matchtype in ('single', 'multiple'):
+            self.pattern = self._compile(spec.get('regex'))
+            self.groups = [self._group(spec, index)
+                           for index in range(1, self.pattern.groups + 1)]
+        elif self.matchtype == 'table':
+            self.groups = []
+            index = 1
+            while f'match{index}' in spec:
+                self.groups.append(self._group(spec, index))
+                index += 1
+            if not self.groups:
+                raise ValueError(f'parsespec {self.id} table has no match1 '
+                                 f'column')
+            # Column titles as they appear in the header, default of the
+            # Influx key name
+            self.columns = [str(spec.get(f'match{index}column',
+                                         group[0]))
+                            for index, group in enumerate(self.groups, 1)]
+            self.titles = [re.compile(r'(?<!\S)' + re.escape(title) +
+                                      r'(?!\S)')
+                           for title in self.columns]
+            self.rowpattern = None
+            if spec.get('rowregex') is not None:
+                self.rowpattern = self._compile(spec['rowregex'])
+        elif self.matchtype == 'iterative':
+            self.regexmatches = []
+            for groupspec in spec.get('regexmatches') or []:
+                pattern = self._compile(groupspec.get('regex'))
+                if 'groups' in groupspec:
+                    groups = [(group['groupname'], group['groupkeytype'],
+                               group['groupvaluetype'])
+                              for group in groupspec['groups']]
+                    self.regexmatches.append((pattern, groups, True))
+                else:
+                    group = (groupspec['groupname'],
+                             groupspec['groupkeytype'],
+                             groupspec['groupvaluetype'])
+                    self.regexmatches.append((pattern, [group], False))
+        else:
+            raise ValueError(f'parsespec {self.id} has unknown matchtype '
+                             f'"{self.matchtype}"')
+
+        self._extract = getattr(self, f'_extract_{self.matchtype}')
+
+        # Output parsed a block of lines at a time as it is read, so it is
+        # never held whole; each match must fit within one line
+        self.streaming = bool(spec.get('streaming', False))
+        if self.streaming and self.matchtype not in ('multiple', 'table'):
+            raise ValueError(f'parsespec {self.id} is streaming but '
+                             f'{self.matchtype} output cannot be parsed '
+                             f'line by line')
+
+    def __repr__(self):
+        return f'<ParseSpec {self.id} {self.matchtype} {self.measurement}>'
+
+    def _policy(self, spec):
+        # Optional write policy applied by changeFilter.py
+        self.changesonly = bool(spec.get('changesonly', False))
+        self.heartbeat = spec.get('heartbeat', DEFAULT_HEARTBEAT)
+        if (not isinstance(self.heartbeat, int) or
+                isinstance(self.heartbeat, bool) or self.heartbeat < 1):
+            raise ValueError(f'parsespec {self.id} heartbeat must be a '
+                             f'whole number of polls, not '
+                             f'"{self.heartbeat}"')
+        self.counters = {}
+        for counter in spec.get('counters') or []:
+            try:
+                name = counter['countername']
+                countertype = counter.get('countertype', 'delta')
+            except (KeyError, TypeError, AttributeError):
+                raise ValueError(f'parsespec {self.id} counter entry '
+                                 f'{counter} has no countername')
+            if countertype not in COUNTER_TYPES:
+                raise ValueError(f'parsespec {self.id} counter {name} has '
+                                 f'unknown countertype "{countertype}"')
+            self.counters[name] = countertype
+
+    def _compile(self, regex):
+        if regex is None:
+            raise ValueError(f'parsespec {self.id} has no regex')
+        try:
+            return re.compile(regex, REGEX_FLAGS)
+        except re.error as e:
+            raise ValueError(f'parsespec {self.id} regex is invalid: {e}')
+
+    def _group(self, spec, index):
+        try:
+            return (spec[f'match{index}'],
+                    spec[f'match{index}keytype'],
+                    spec[f'match{index}valuetype'])
+        except KeyError as e:
+            raise ValueError(f'parsespec {self.id} regex has {index} or more '
+                             f'capture groups but no {e} entry')
+
+    def extract(self, device, output):
+        """Match output against the spec
+
+        :param device: host alias the output was collected from
+        :param output: command output text, or the StreamedOutput of a
+          streaming spec
+        :returns: list of measurements
+        """
+        if isinstance(output, StreamedOutput):
+            return output.measurements
+        return self._extract(device, output)
+
+    def stream(self, device, keep=False):
+        """Incremental parser for one output of a streaming spec
+
+        :param device: host alias the output is collected from
+        :param keep: also keep the output text (for --record)
+        :returns: OutputStream
+        """
+        return OutputStream(self, device, keep)
+
+    def _new_measurement(self, device):
+        return [device, self.measurement, *self.statictags]
+
+    def _extract_single(self, device, output):
+        match = self.pattern.search(output)
+        if match is None:
+            return []
+        measurement = self._new_measurement(device)
+        for group, value in zip(self.groups, match.groups()):
+            measurement.append((*group, value))
+        return [measurement]
+
+    def _extract_multiple(self, device, output):
+        # One measurement per match, e.g. per interface or process line
+        measurements = []
+        for match in self.pattern.finditer(output):
+            measurement = self._new_measurement(device)
+            for group, value in zip(self.groups, match.groups()):
+                measurement.append((*group, value))
+            measurements.append(measurement)
+        return measurements
+
+    def _extract_table(self, device, output):
+        return _Table(self).rows(device, output.splitlines())
+
+    def _extract_iterative(self, device, output):
+        # Several patterns over the same output, combined into one
+        # measurement; a 'groups' entry spreads successive matches of one
+        # pattern over its list of group names
+        measurement = self._new_measurement(device)
+        matched = False
+        for pattern, groups, multimatch in self.regexmatches:
+            if multimatch:
+                # The whole match when the pattern captures nothing
+                index = 1 if pattern.groups else 0
+                for group, match in zip(groups, pattern.finditer(output)):
+                    measurement.append((*group, match.group(index).strip()))
+                    matched = True
+            else:
+                match = pattern.search(output)
+                if match is None:
+                    print(f'WARNING: No match of [{pattern.pattern}] on '
+                          f'{device} - skipping')
+                    continue
+                measurement.append((*groups[0], match.group(1).strip()))
+                matched = True
+        return [measurement] if matched else []
+
+
+class _Table:
+    # Column layout of one table output, learned from its header line,
+    # and the rows that follow it
+    def __init__(self, parsespec):
+        self.parsespec = parsespec
+        self.header = None
+        # Columns that fill a field - a row filling none of them (the
+        # prompt after the table, a stray word) is not a data row
+        self.fields = {index for index, group in enumerate(parsespec.groups)
+                       if group[1] == 'field'}
+
+    def _find_header(self, lines):
+        # Index of the first line naming every column, and the column
+        # spans in it - each referenced title (which may be several
+        # words) plus every other word of the header as a column of its
+        # own, so unreferenced columns still bound the referenced ones
+        parsespec = self.parsespec
+        for number, line in enumerate(lines):
+            if parsespec.columns[0] not in line:
+                continue
+            found = [pattern.search(line) for pattern in parsespec.titles]
+            if None in found:
+                continue
+            spans = [(match.start(), match.end(), index)
+                     for index, match in enumerate(found)]
+            for token in _TOKEN.finditer(line):
+                if not any(start <= token.start() < end
+                           for start, end, _ in spans):
+                    spans.append((token.start(), token.end(), None))
+            spans.sort()
+            self.header = line.strip()
+            self.spans = spans
+            self.starts = [span[0] for span in spans]
+            self.keys = [span[2] for span in spans]
+            # Column each header position falls in
+            self.owner = [max(bisect.bisect_right(self.starts, position) - 1,
+                              0)
+                          for position in range(spans[-1][0] + 1)]
+            return number
+        return None
+
+    def rows(self, device, lines):
+        # One measurement per row, in a single pass with no backtracking.
+        # A word belongs to the header column it starts under (text is
+        # left-aligned) unless it reaches into a later column's title
+        # more, as right-aligned numbers do
+        first = 0
+        if self.header is None:
+            number = self._find_header(lines)
+            if number is None:
+                return []
+            first = number + 1
+        parsespec = self.parsespec
+        spans, starts, keys, owner = (self.spans, self.starts, self.keys,
+                                      self.owner)
+        last = len(spans) - 1
+        measurements = []
+        for line in itertools.islice(lines, first, None):
+            if _RULE.match(line) or line.strip() == self.header:
+                continue
+            if parsespec.rowpattern is not None and \
+                    not parsespec.rowpattern.match(line):
+                continue
+            cells = {}
+            for token in _TOKEN.finditer(line):
+                start, end = token.span()
+                column = owner[start] if start < len(owner) else last
+                if column < last and starts[column + 1] < end:
+                    best, overlap = column, _overlap(spans[column], start,
+                                                     end)
+                    while column < last and starts[column + 1] < end:
+                        column += 1
+                        width = _overlap(spans[column], start, end)
+                        if width > overlap:
+                            best, overlap = column, width
+                    column = best
+                index = keys[column]
+                if index is None:
+                    continue
+                if index in cells:
+                    cells[index] += ' ' + token.group()
+                else:
+                    cells[index] = token.group()
+            if self.fields.isdisjoint(cells):
+                continue
+            measurement = parsespec._new_measurement(device)
+            for index, group in enumerate(parsespec.groups):
+                if index in cells:
+                    measurement.append((*group, cells[index]))
+            measurements.append(measurement)
+        return measurements
+
+
+class StreamedOutput:
+    """Measurements from output that was parsed as it was read, carried
+    in a collected record in place of the output text
+
+    :param measurements: list of measurements
+    :param nbytes: characters of output parsed
+    :param text: the output text, when it was kept, otherwise None
+    """
+    def __init__(self, measurements, nbytes, text=None):
+        self.measurements = measurements
+        self.nbytes = nbytes
+        self.text = text
+
+    def __len__(self):
+        # Size of the output it stands for, as for output text
+        return self.nbytes
+
+    def __repr__(self):
+        return (f'<StreamedOutput {self.nbytes} chars, '
+                f'{len(self.measurements)} measurements>')
+
+
+class OutputStream:
+    """Parses one output of a streaming spec a block of lines at a time
+
+    :param parsespec: streaming ParseSpec
+    :param device: host alias the output is collected from
+    :param keep: also keep the output text
+    """
+    def __init__(self, parsespec, device, keep=False):
+        self.parsespec = parsespec
+        self.device = device
+        self.nbytes = 0
+        self.measurements = []
+        self._kept = [] if keep else None
+        self._table = _Table(parsespec) \
+            if parsespec.matchtype == 'table' else None
+
+    def feed(self, text):
+        """Parse a block of output that ends at a line boundary"""
+        self.nbytes += len(text)
+        if self._kept is not None:
+            self._kept.append(text)
+        if self._table is None:
+            found = self.parsespec._extract_multiple(self.device, text)
+        else:
+            found = self._table.rows(self.device, text.splitlines())
+        self.measurements.extend(found)
+
+    def take(self):
+        """Hand over the measurements parsed so far
+
+        :returns: list of measurements, no longer held by the stream
+        """
+        measurements, self.measurements = self.measurements, []
+        return measurements
+
+    def close(self, text=''):
+        """Parse the last of the output
+
+        :returns: StreamedOutput for the collected record
+        """
+        if text:
+            self.feed(text)
+        text = None if self._kept is None else ''.join(self._kept)
+        return StreamedOutput(self.measurements, self.nbytes, text)
+
+
+def compile_parsespecs(parsespecs):
+    """Compile all parsing specifications from a parameters file
+
+    :param parsespecs: list of parsespec dictionaries
+    :returns: dictionary of ParseSpec objects keyed by parsespec id
+    :raises ValueError: if any spec is invalid or an id is duplicated
+    """
+    compiled = {}
+    for spec in parsespecs or []:
+        parsespec = ParseSpec(spec)
+        if parsespec.id in compiled:
+            raise ValueError(f'parsespec {parsespec.id} is defined twice')
+        compiled[parsespec.id] = parsespec
+    logging.debug('Compiled parsespecs: %s', list(compiled.values()))
+    return compiled
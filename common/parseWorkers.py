@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Runs parsing specifications in a pool of worker processes
+ (parseWorkers.py)
+
+SSH collection waits on the network, but matching the parsespec
+regexes over large command outputs is CPU work that a single Python
+process can only do on one core.  ParsePool sends collected output
+records to worker processes, each holding its own compiled copy of the
+parsing specifications, and gathers the measurements they return.
+
+Records are grouped into chunks of roughly chunk_bytes of output so a
+handful of large outputs, or many small ones, travel to a worker in a
+single hand-off.
+
+Required inputs/variables:
+    parsespecs - dictionary of compiled ParseSpec objects (see
+        parseSpecs.py)
+    records - lists of (alias, command, parsespec, output) tuples
+
+Outputs:
+    measurements in the same form as ParseSpec.extract(), and optional
+    per-output match timings for self-telemetry
+
+Version log:
+v1   2026-1017  Created for multi-core parsing (--parse-workers)
+v2   2026-1017  Report match time per output to an observer; optional
+    refine hook per output (change suppression)
+
+Credits:
+"""
+__version__ = '2'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from common import parseSpecs
+
+# Compiled specs in each worker process
+_SPECS = None
+
+
+def _init_worker(specs):
+    global _SPECS
+    _SPECS = parseSpecs.compile_parsespecs(specs)
+
+
+def parse_chunk(records):
+    """Parse a chunk of output records in a worker process
+
+    :param records: list of (alias, command, parsespec, output) tuples
+    :returns: list of measurements, and a list of (alias, parsespec,
+      seconds, points) timings
+    """
+    measurements = []
+    timings = []
+    for record in records:
+        parsespec = _SPECS.get(record[2])
+        if parsespec is None:
+            print(f'WARNING: parsespec {record[2]} for command '
+                  f'[{record[1]}] is not defined - skipping')
+            continue
+        began = time.perf_counter()
+        found = parsespec.extract(record[0], record[3])
+        timings.append((record[0], record[2], time.perf_counter() - began,
+                        len(found)))
+        measurements.extend(found)
+    return measurements, timings
+
+
+def chunk_records(device_results, chunk_bytes=1024 * 1024):
+    """Group output records into chunks of about chunk_bytes of output
+
+    :param device_results: list of per-device record lists
+    :returns: list of record lists
+    """
+    chunks = []
+    current = []
+    size = 0
+    for device_records in device_results:
+        for record in device_records:
+            current.append(record)
+            size += len(record[3])
+            if size >= chunk_bytes:
+                chunks.append(current)
+                current = []
+                size = 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class ParsePool:
+    """Process pool for parsing collected output
+
+    :param parsespecs: dictionary of compiled ParseSpec objects
+    :param workers: number of worker processes
+    :param chunk_bytes: approximate output bytes per worker hand-off
+    :param observer: optional callable(alias, parsespec, seconds, points)
+      called for every output parsed
+    :param refine: optional callable(parsespec, measurements) returning
+      the measurements to keep from each output
+    """
+    def __init__(self, parsespecs, workers, chunk_bytes=1024 * 1024,
+                 observer=None, refine=None):
+        self.workers = workers
+        self.chunk_bytes = chunk_bytes
+        self.observer = observer
+        self.refine = refine
+        specs = [parsespec.spec for parsespec in parsespecs.values()]
+        # Spawned workers - forking a process that already runs the
+        # collector and writer threads is not safe
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(specs,))
+
+    def _measurements(self, result):
+        measurements, timings = result
+        if self.observer is not None:
+            for timing in timings:
+                self.observer(*timing)
+        if self.refine is None:
+            return measurements
+        # Measurements arrive in output order, points at a time
+        refined = []
+        start = 0
+        for _, parsespec, _, points in timings:
+            refined.extend(self.refine(parsespec,
+                                       measurements[start:start + points]))
+            start += points
+        return refined
+
+    def submit(self, records):
+        """Parse one chunk of records; returns a concurrent Future of the
+        measurements"""
+        outer = Future()
+
+        def done(inner):
+            try:
+                outer.set_result(self._measurements(inner.result()))
+            except Exception as e:
+                outer.set_exception(e)
+        self._executor.submit(parse_chunk, records).add_done_callback(done)
+        return outer
+
+    def extract(self, device_results):
+        """Parse many devices' output across the worker processes
+
+        :param device_results: list of per-device record lists
+        :returns: list of measurements
+        """
+        chunks = chunk_records(device_results, self.chunk_bytes)
+        logging.debug('Parsing %d chunk(s) on %d worker(s)', len(chunks),
+                      self.workers)
+        measurements = []
+        for result in self._executor.map(parse_chunk, chunks):
+            measurements.extend(self._measurements(result))
+        return measurements
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Spreads device polls evenly across the polling interval
+ (pollScheduler.py)
+
+Instead of polling every device at the same instant, each device gets a
+fixed offset into the interval derived from a hash of its host alias.
+The offset is stable across restarts and configuration reloads, so a
+device is always polled at the same point in the interval and the load
+on the collector, the network and the AAA servers stays flat.
+
+Commands may set their own frequency (and phase) in the parameters
+file.  A device's commands are lined up on its shortest frequency: the
+slots of a slower command fall on slots of the faster ones, spread over
+the slower interval, so whatever is due for a device in a tick is
+collected in one session.
+
+The caller wakes up every tick and asks which devices' commands fell
+due in the time since the previous tick.  A device whose previous poll is still
+running when its slot comes round again is skipped rather than polled
+twice; polls that start well after their slot are counted as late.
+Both are summarized once per interval by report().
+
+Required inputs/variables:
+    frequency - polling interval in seconds
+    devices - host aliases and their command lists to schedule
+
+Outputs:
+    (alias, slot time, commands) for the devices due in each tick
+
+Version log:
+v1   2026-1017  Created to replace the burst-per-interval schedule
+v2   2026-1017  Per-command frequency and phase
+
+Credits:
+"""
+__version__ = '2'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import math
+import threading
+import time
+import zlib
+
+
+class PollScheduler:
+    """Stable per-device offsets and skip/late accounting
+
+    :param frequency: polling interval in seconds, for commands that do
+      not set their own and for the interval summaries
+    :param tick: seconds between checks for due devices
+    :param late_after: seconds after its slot a poll counts as late
+      (default of a tenth of the interval, at least one tick)
+    """
+    def __init__(self, frequency, tick=1.0, late_after=None):
+        self.frequency = frequency
+        self.tick = min(tick, frequency)
+        self.late_after = late_after or max(frequency / 10, self.tick)
+        self._fractions = {}
+        self._offsets = {}
+        self._lock = threading.Lock()
+        self.polled = 0
+        self.skipped = []
+        self.late = []
+
+    def _fraction(self, alias):
+        # Stable position of the device in any interval, from 0 to 1
+        fraction = self._fractions.get(alias)
+        if fraction is None:
+            fraction = zlib.crc32(alias.encode('utf-8')) / 2 ** 32
+            self._fractions[alias] = fraction
+        return fraction
+
+    def offset(self, alias, frequency=None, base=None, phase=0):
+        """Seconds into each interval at which a device's command runs
+
+        :param frequency: the command's interval (default of frequency)
+        :param base: the device's shortest command interval; slots of
+          slower commands fall on slots of this one
+        :param phase: extra seconds added to the offset
+        """
+        frequency = frequency or self.frequency
+        base = min(base or frequency, frequency)
+        key = (alias, frequency, base, phase)
+        offset = self._offsets.get(key)
+        if offset is None:
+            fraction = self._fraction(alias)
+            offset = fraction * base
+            # Spread slower commands over their interval, on base slots
+            offset += base * math.floor(fraction * frequency / base)
+            offset = (offset + phase) % frequency
+            self._offsets[key] = offset
+        return offset
+
+    def cycle(self, when):
+        """Number of the interval a time falls in"""
+        return int(when // self.frequency)
+
+    @staticmethod
+    def _slot(offset, frequency, start, end):
+        # Latest slot at or before end, if it is after start
+        slot = math.floor((end - offset) / frequency) * frequency + offset
+        return slot if start < slot <= end else None
+
+    def due(self, devices, start, end):
+        """Devices with commands due in the window start < slot <= end
+
+        :param devices: list of (alias, commands) pairs; a command may
+          have 'frequency' and 'phase' entries in seconds
+        :returns: list of (alias, slot time, due commands)
+        """
+        found = []
+        for alias, commands in devices:
+            base = min((item.get('frequency') or self.frequency
+                        for item in commands), default=self.frequency)
+            slot = None
+            due = []
+            for item in commands:
+                frequency = item.get('frequency') or self.frequency
+                offset = self.offset(alias, frequency, base,
+                                     item.get('phase', 0))
+                command_slot = self._slot(offset, frequency, start, end)
+                if command_slot is not None:
+                    due.append(item)
+                    slot = command_slot if slot is None else \
+                        min(slot, command_slot)
+            if due:
+                found.append((alias, slot, due))
+        return found
+
+    def wait(self, last):
+        """Sleep until the tick after last; returns the new tick time"""
+        pause = last + self.tick - time.time()
+        if pause > 0:
+            time.sleep(pause)
+        return time.time()
+
+    def record_skip(self, alias):
+        with self._lock:
+            self.skipped.append(alias)
+
+    def record_poll(self, alias, slot, started):
+        """Count a poll and whether it started late"""
+        with self._lock:
+            self.polled += 1
+            if started is not None and started - slot > self.late_after:
+                self.late.append((alias, started - slot))
+
+    def report(self):
+        """Summary of the interval just finished; resets the counts"""
+        with self._lock:
+            polled, skipped, late = self.polled, self.skipped, self.late
+            self.polled = 0
+            self.skipped = []
+            self.late = []
+        summary = (f'{polled} polled, {len(skipped)} skipped '
+                   f'(previous poll still running), {len(late)} late')
+        if skipped:
+            summary += f'\n  Skipped: {", ".join(sorted(set(skipped)))}'
+        if late:
+            summary += '\n  Late: ' + ', '.join(
+                f'{alias} ({delay:.1f}s)' for alias, delay in late)
+        return summary
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Remembers learned device prompts between runs
+ (promptCache.py)
+
+Learning a device's prompt and SSH server version takes a whole login.
+The cache keeps what was learned in a small JSON file, keyed by host
+alias and management address, so a restart can start polling straight
+away instead of logging in to every device twice.  Entries older than
+the TTL are ignored and learned again.
+
+    {"device-1@10.1.1.1": {"server_version": "SSH-2.0-Cisco-1.25",
+                           "prompt": "device-1#",
+                           "learned": 1760000000.0}}
+
+Required inputs/variables:
+    filename - cache file path; created on first save
+
+Outputs:
+    (server_version, prompt) for devices learned within the TTL
+
+Version log:
+v1   2026-1017  Created to skip the startup prompt learning pass
+
+Credits:
+"""
+__version__ = '1'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import json
+import logging
+import os
+import threading
+import time
+
+
+class PromptCache:
+    """Learned prompts and server versions with a time to live
+
+    :param filename: JSON cache file
+    :param ttl: seconds an entry is trusted after it was learned
+    """
+    def __init__(self, filename, ttl=7 * 24 * 3600):
+        self.filename = filename
+        self.ttl = ttl
+        self.entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        try:
+            with open(filename, 'r') as cachefile:
+                self.entries = json.load(cachefile)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f'WARNING: prompt cache {filename} not loaded - {e}')
+        logging.debug('Prompt cache loaded %d entries', len(self.entries))
+
+    @staticmethod
+    def _key(alias, host):
+        return f'{alias}@{host}'
+
+    def get(self, alias, host):
+        """Cached (server_version, prompt), or None if unknown or expired"""
+        entry = self.entries.get(self._key(alias, host))
+        if entry is None or time.time() - entry['learned'] > self.ttl:
+            return None
+        return entry['server_version'], entry['prompt']
+
+    def put(self, alias, host, server_version, prompt):
+        with self._lock:
+            self.entries[self._key(alias, host)] = {
+                'server_version': server_version,
+                'prompt': prompt,
+                'learned': time.time()}
+            self._dirty = True
+
+    def forget(self, alias, host):
+        """Drop a device's entry, e.g. once its prompt is known to be wrong"""
+        with self._lock:
+            if self.entries.pop(self._key(alias, host), None) is not None:
+                self._dirty = True
+
+    def save(self):
+        """Write the cache if it changed, replacing the file atomically"""
+        with self._lock:
+            if not self._dirty:
+                return
+            temp = self.filename + '.tmp'
+            try:
+                with open(temp, 'w') as cachefile:
+                    json.dump(self.entries, cachefile, indent=1)
+                os.replace(temp, self.filename)
+                self._dirty = False
+            except OSError as e:
+                print(f'WARNING: prompt cache {self.filename} not saved - {e}')
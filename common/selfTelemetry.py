@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Collector self-telemetry - where the polling time goes
+ (selfTelemetry.py)
+
+Counts and times each stage of collection while it runs - SSH connects,
+every command (latency, bytes read, prompt timeouts), regex matching per
+parsespec, points produced and InfluxDB writes - and hands the totals
+since the last drain back as measurements for the ssh2influx_internal
+measurement, written next to the collected data.
+
+    ssh2influx_internal,device=rtr1,stage=device connects=1i,...
+    ssh2influx_internal,device=rtr1,stage=command,command=show\\ version ...
+    ssh2influx_internal,device=<collector>,stage=parse,parsespec=201 ...
+    ssh2influx_internal,device=<collector>,stage=write,influx=prod ...
+
+The most recently drained values can also be served in Prometheus text
+format by MetricsServer on a local port.
+
+Required inputs/variables:
+    none - the collector calls the connected(), command(), parsed() and
+        wrote() hooks as it works
+
+Outputs:
+    measurements in the [device, measurement, (name, keytype,
+    valuetype, value), ...] form used by lineProtocol.py
+
+Version log:
+v1   2026-1017  Created
+v2   2026-1017  parsed() takes points of streamed output blocks
+
+Credits:
+"""
+__version__ = '2'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import logging
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MEASUREMENT = 'ssh2influx_internal'
+
+
+def _field(name, value):
+    valuetype = 'integer' if isinstance(value, int) else 'decimal'
+    return (name, 'field', valuetype, value)
+
+
+def _tag(name, value):
+    return (name, 'tag', 'string', value)
+
+
+class SelfTelemetry:
+    """Thread-safe stage counters, drained once per poll
+
+    :param name: device tag for collector-wide points (default of the
+      collector's hostname)
+    """
+    def __init__(self, name=None):
+        self.name = name or socket.gethostname()
+        self._lock = threading.Lock()
+        self._reset()
+        self.latest = []
+
+    def _reset(self):
+        self._devices = {}
+        self._commands = {}
+        self._specs = {}
+        self._writes = {}
+
+    def _device(self, alias):
+        stats = self._devices.get(alias)
+        if stats is None:
+            stats = self._devices[alias] = {
+                'connects': 0, 'connect_seconds': 0.0, 'commands': 0,
+                'command_seconds': 0.0, 'bytes_read': 0,
+                'prompt_timeouts': 0, 'points': 0}
+        return stats
+
+    def connected(self, alias, seconds):
+        """An SSH session was opened and prepared"""
+        with self._lock:
+            stats = self._device(alias)
+            stats['connects'] += 1
+            stats['connect_seconds'] += seconds
+
+    def command(self, alias, command, seconds, nbytes):
+        """A command returned nbytes of output after seconds"""
+        with self._lock:
+            stats = self._device(alias)
+            stats['commands'] += 1
+            stats['command_seconds'] += seconds
+            stats['bytes_read'] += nbytes
+            counts = self._commands.get((alias, command))
+            if counts is None:
+                counts = self._commands[(alias, command)] = [0, 0.0, 0.0, 0]
+            counts[0] += 1
+            counts[1] += seconds
+            counts[2] = max(counts[2], seconds)
+            counts[3] += nbytes
+
+    def prompt_timeout(self, alias):
+        """The device prompt did not come back in time"""
+        with self._lock:
+            self._device(alias)['prompt_timeouts'] += 1
+
+    def parsed(self, alias, parsespec, seconds, points, outputs=1):
+        """Output was matched against a parsespec; a block of a streamed
+        output counts points but no output"""
+        with self._lock:
+            self._device(alias)['points'] += points
+            counts = self._specs.get(parsespec)
+            if counts is None:
+                counts = self._specs[parsespec] = [0, 0.0, 0]
+            counts[0] += outputs
+            counts[1] += seconds
+            counts[2] += points
+
+    def wrote(self, influx, seconds, lines, failed_batches):
+        """A write to an InfluxDB target finished"""
+        with self._lock:
+            counts = self._writes.get(influx)
+            if counts is None:
+                counts = self._writes[influx] = [0, 0.0, 0.0, 0, 0]
+            counts[0] += 1
+            counts[1] += seconds
+            counts[2] = max(counts[2], seconds)
+            counts[3] += lines
+            counts[4] += failed_batches
+
+    def drain(self, spools=None):
+        """Measurements for everything counted since the last drain
+
+        :param spools: optional dictionary of WriteSpool by Influx alias,
+          whose depth is reported with the write stage
+        :returns: list of measurements
+        """
+        with self._lock:
+            devices, commands = self._devices, self._commands
+            specs, writes = self._specs, self._writes
+            self._reset()
+        measurements = []
+        for alias, stats in devices.items():
+            measurements.append([alias, MEASUREMENT, _tag('stage', 'device'),
+                                 *(_field(name, value)
+                                   for name, value in stats.items())])
+        for (alias, command), (count, seconds, longest, nbytes) in \
+                commands.items():
+            measurements.append([alias, MEASUREMENT,
+                                 _tag('stage', 'command'),
+                                 _tag('command', command),
+                                 _field('count', count),
+                                 _field('seconds', seconds / count),
+                                 _field('max_seconds', longest),
+                                 _field('bytes_read', nbytes)])
+        for parsespec, (outputs, seconds, points) in specs.items():
+            measurements.append([self.name, MEASUREMENT,
+                                 _tag('stage', 'parse'),
+                                 _tag('parsespec', str(parsespec)),
+                                 _field('outputs', outputs),
+                                 _field('seconds', seconds),
+                                 _field('points', points)])
+        for influx in set(writes) | set(spools or {}):
+            count, seconds, longest, lines, failed = \
+                writes.get(influx, [0, 0.0, 0.0, 0, 0])
+            measurement = [self.name, MEASUREMENT, _tag('stage', 'write'),
+                           _tag('influx', influx),
+                           _field('writes', count),
+                           _field('seconds', seconds),
+                           _field('max_seconds', longest),
+                           _field('lines', lines),
+                           _field('failed_batches', failed)]
+            spool = (spools or {}).get(influx)
+            if spool is not None:
+                segments, nbytes = spool.depth()
+                measurement.append(_field('spool_segments', segments))
+                measurement.append(_field('spool_bytes', nbytes))
+            measurements.append(measurement)
+        self.latest = measurements
+        logging.debug('Self-telemetry drained %d points', len(measurements))
+        return measurements
+
+    def exposition(self):
+        """The latest drained values in Prometheus text format"""
+        lines = []
+        for item in self.latest:
+            labels = {'device': item[0]}
+            fields = []
+            for name, keytype, _, value in item[2:]:
+                if keytype == 'tag':
+                    labels[name] = value
+                else:
+                    fields.append((name, value))
+            stage = labels.pop('stage')
+            labelset = ','.join(f'{name}="{_label(value)}"'
+                                for name, value in labels.items())
+            for name, value in fields:
+                lines.append(f'{MEASUREMENT}_{stage}_{name}{{{labelset}}} '
+                             f'{value}\n')
+        return ''.join(lines)
+
+
+def _label(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.telemetry.exposition().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """Serves SelfTelemetry.exposition() on http://address:port/metrics
+
+    :param telemetry: SelfTelemetry to serve
+    :param port: TCP port to listen on
+    :param address: address to listen on (default of localhost only)
+    """
+    def __init__(self, telemetry, port, address='127.0.0.1'):
+        self._server = ThreadingHTTPServer((address, port), _MetricsHandler)
+        self._server.telemetry = telemetry
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='MetricsServer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
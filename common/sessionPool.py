@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Keeps authenticated SSH sessions open between polling cycles
+ (sessionPool.py)
+
+Logging in to a device (and the AAA/TACACS round trips behind it) is
+usually the most expensive part of a poll.  The pool holds one
+prepared interactive shell per device, keyed by host alias, so later
+cycles can send their commands straight to the waiting prompt.
+
+Sessions are kept alive with SSH keepalives, closed when they have
+been idle longer than the idle timeout, and transparently re-opened
+when the device or network drops them.
+
+Required inputs/variables:
+    opener - coroutine function supplied by the caller that logs in
+        to a device and returns an (asyncssh connection, process)
+        pair with the shell ready at its prompt
+
+Outputs:
+    PooledSession objects holding the live connection and shell
+
+Version log:
+v1   2026-1017  Created for persistent sessions across polling cycles
+
+Credits:
+"""
+__version__ = '1'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import asyncio
+import logging
+import time
+
+
+class PooledSession:
+    # A logged-in SSH connection plus its prepared interactive shell
+    def __init__(self, alias, conn, process):
+        self.alias = alias
+        self.conn = conn
+        self.process = process
+        self.opened = time.monotonic()
+        self.last_used = self.opened
+        # Only one poll may drive the shell at a time
+        self.lock = asyncio.Lock()
+
+    def is_alive(self):
+        return not (self.conn.is_closed() or self.process.is_closing())
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def close(self):
+        self.process.close()
+        self.conn.close()
+
+
+class SessionPool:
+    """Pool of persistent device sessions keyed by host alias
+
+    Must be created and used from the collector event loop.
+
+    :param idle_timeout: seconds a session may sit unused before it is
+      closed by evict_idle()
+    :param keepalive_interval: seconds between SSH keepalive requests
+      on pooled connections (0 disables keepalives)
+    :param keepalive_count_max: unanswered keepalives before the
+      connection is considered dead
+    """
+    def __init__(self, idle_timeout=900, keepalive_interval=30,
+                 keepalive_count_max=3):
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.keepalive_count_max = keepalive_count_max
+        self.sessions = {}
+        self._opening = {}
+
+    def __len__(self):
+        return len(self.sessions)
+
+    async def acquire(self, alias, opener):
+        """Return a live session for alias, opening one if needed
+
+        :param alias: host alias the session belongs to
+        :param opener: coroutine function returning (conn, process)
+        :returns: PooledSession
+        """
+        session = self.sessions.get(alias)
+        if session is not None and session.is_alive():
+            return session
+        if session is not None:
+            logging.debug('Pooled session for %s dropped - reconnecting', alias)
+            self.discard(alias)
+
+        # Collapse simultaneous opens for the same device into one login
+        pending = self._opening.get(alias)
+        if pending is None:
+            pending = asyncio.ensure_future(self._open(alias, opener))
+            self._opening[alias] = pending
+            pending.add_done_callback(
+                lambda _: self._opening.pop(alias, None))
+        return await pending
+
+    async def _open(self, alias, opener):
+        conn, process = await opener()
+        session = PooledSession(alias, conn, process)
+        self.sessions[alias] = session
+        logging.debug('Opened pooled session for %s', alias)
+        return session
+
+    def discard(self, alias):
+        """Close and forget the session for alias, if there is one"""
+        session = self.sessions.pop(alias, None)
+        if session is not None:
+            session.close()
+
+    def evict_idle(self):
+        """Close sessions idle past the timeout or already dropped
+
+        :returns: list of evicted host aliases
+        """
+        now = time.monotonic()
+        evicted = [alias for alias, session in self.sessions.items()
+                   if not session.lock.locked() and
+                   (not session.is_alive() or
+                    now - session.last_used > self.idle_timeout)]
+        for alias in evicted:
+            self.discard(alias)
+        if evicted:
+            logging.debug('Evicted idle sessions: %s', evicted)
+        return evicted
+
+    async def run_evictor(self, interval=60):
+        """Background task that periodically evicts idle sessions"""
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+
+    def close_all(self):
+        for alias in list(self.sessions):
+            self.discard(alias)
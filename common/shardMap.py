@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Splits the device inventory across several collector nodes
+ (shardMap.py)
+
+With --shard K/N each of N collectors polls only the devices that hash
+to its shard K.  Devices are placed by rendezvous (highest random
+weight) hashing of the host alias: every shard scores every alias and
+the highest score wins.  Going from N to N+1 shards moves only the
+devices the new shard now wins - about 1/(N+1) of them - and every node
+works out the same placement from the same inventory with no
+coordination.
+
+Optionally the nodes hold leases in a shared SQLite file.  Each node
+renews its shard's lease on a heartbeat; a shard whose lease runs out
+is dead and its devices fall to each device's next highest scoring
+live shard, so the survivors share the work between them.  When the
+node comes back its devices move back to it.
+
+    collector-a$ python SSH2Influx.py -p job.yml --shard 1/3 --shard-lease /shared/leases.db
+    collector-b$ python SSH2Influx.py -p job.yml --shard 2/3 --shard-lease /shared/leases.db
+    collector-c$ python SSH2Influx.py -p job.yml --shard 3/3 --shard-lease /shared/leases.db
+
+Required inputs/variables:
+    shard, shards - this node's shard number (1 to N) and N
+
+Outputs:
+    whether this node owns a device, given the shards alive
+
+Version log:
+v1   2026-1017  Created for --shard
+v2   2026-1017  Heartbeat failures are warned about; a node whose own
+    lease has run out stops polling the devices the others take over
+
+Credits:
+"""
+__version__ = '2'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import argparse
+import contextlib
+import hashlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+
+def parse_shard(text):
+    """argparse type for 'K/N', e.g. 2/3
+
+    :returns: (K, N)
+    """
+    try:
+        shard, shards = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'"{text}" is not K/N, e.g. 2/3')
+    if not 1 <= shard <= shards:
+        raise argparse.ArgumentTypeError(f'shard {shard} is not between 1 '
+                                         f'and {shards}')
+    return shard, shards
+
+
+def _score(alias, shard):
+    digest = hashlib.blake2b(f'{shard}/{alias}'.encode('utf-8'),
+                             digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class ShardMap:
+    """Rendezvous hash placement of devices on shards
+
+    :param shard: this node's shard, 1 to shards
+    :param shards: number of shards
+    """
+    def __init__(self, shard, shards):
+        self.shard = shard
+        self.shards = shards
+
+    def __str__(self):
+        return f'{self.shard}/{self.shards}'
+
+    def owner(self, alias, live=None):
+        """Shard a device belongs to
+
+        :param alias: device host alias
+        :param live: shards alive (default of all of them)
+        """
+        candidates = live or range(1, self.shards + 1)
+        return max(candidates, key=lambda shard: _score(alias, shard))
+
+    def owns(self, alias, live=None):
+        """Whether this node's shard polls the device"""
+        return self.owner(alias, live) == self.shard
+
+
+class ShardLease:
+    """This node's shard lease in a shared SQLite file, renewed by a
+    heartbeat thread
+
+    :param path: SQLite file shared by every node
+    :param shard: this node's shard
+    :param shards: number of shards
+    :param ttl: seconds a lease lasts without a heartbeat
+    """
+    def __init__(self, path, shard, shards, ttl=60):
+        self.path = path
+        self.shard = shard
+        self.shards = shards
+        self.ttl = ttl
+        self.node = f'{socket.gethostname()}:{os.getpid()}'
+        self.started = time.time()
+        self.expires = 0
+        self._warned = set()
+        self._live = tuple(range(1, shards + 1))
+        self._stop = threading.Event()
+        with self._connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS leases ('
+                       'shard INTEGER PRIMARY KEY, shards INTEGER, '
+                       'node TEXT, expires REAL)')
+        self.heartbeat()
+        self._thread = threading.Thread(target=self._beat,
+                                        name='ShardLease', daemon=True)
+        self._thread.start()
+
+    @contextlib.contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def heartbeat(self):
+        """Take or renew this node's lease"""
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute('SELECT node, expires FROM leases WHERE '
+                             'shard = ?', (self.shard,)).fetchone()
+            if row is not None and row[0] != self.node and row[1] > now \
+                    and row[0] not in self._warned:
+                self._warned.add(row[0])
+                print(f'WARNING: shard {self.shard} is also held by '
+                      f'{row[0]} - check the --shard settings')
+            db.execute('INSERT OR REPLACE INTO leases VALUES (?, ?, ?, ?)',
+                       (self.shard, self.shards, self.node, now + self.ttl))
+        self.expires = now + self.ttl
+
+    def live(self):
+        """Shards with a current lease, as a tuple.  This node's shard is
+        left out once its own lease has run out without a heartbeat, as
+        the other nodes are then taking over its devices.  Shards that
+        have never taken a lease count as alive until this node has been
+        up for one lease period, so nodes starting together do not take
+        over each other's devices.  If the store cannot be read the last
+        answer stands"""
+        now = time.time()
+        try:
+            with self._connect() as db:
+                rows = db.execute('SELECT shard, shards, expires FROM '
+                                  'leases').fetchall()
+        except sqlite3.Error as e:
+            print(f'WARNING: shard leases in {self.path} unreadable - '
+                  f'keeping live shards {self._live}: {e}')
+            return self._live
+        leases = {}
+        for shard, shards, expires in rows:
+            if shards != self.shards and ('shards', shard) not in \
+                    self._warned:
+                self._warned.add(('shards', shard))
+                print(f'WARNING: shard {shard} runs with {shards} shards, '
+                      f'not {self.shards} - devices may be polled twice '
+                      f'or not at all')
+            leases[shard] = expires
+        starting = now - self.started < self.ttl
+        self._live = tuple(shard for shard in range(1, self.shards + 1)
+                           if (self.expires if shard == self.shard else
+                               leases.get(shard, now if starting else 0))
+                           >= now)
+        return self._live
+
+    def _beat(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                self.heartbeat()
+            except sqlite3.Error as e:
+                print(f'WARNING: shard {self.shard} lease heartbeat to '
+                      f'{self.path} failed - its devices go to the other '
+                      f'shards if the lease runs out: {e}')
+
+    def stop(self):
+        """Stop the heartbeat and hand the shard over straight away"""
+        self._stop.set()
+        with self._connect() as db:
+            db.execute('DELETE FROM leases WHERE shard = ? AND node = ?',
+                       (self.shard, self.node))
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""CPU and memory profiling scoped to collection stages
+ (stageProfiler.py)
+
+Each stage of a polling cycle (connect, command, parse, encode, write)
+gets its own cProfile profiler and tracemalloc accounting, switched on
+only while that stage runs, so the report shows where time and memory go
+per stage instead of one mixed profile for the whole run.  Stages that
+run on the collector event loop thread are profiled there by wrapping
+their coroutine with profiled().
+
+Required inputs/variables:
+    stages - names of the stages to report, in order
+
+Outputs:
+    text summary report, and optionally one .prof file per stage for
+    tools such as snakeviz or pstats
+
+Version log:
+v1   2026-1017  Created for --profile
+
+Credits:
+"""
+__version__ = '1'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import contextlib
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+
+# tracemalloc's own snapshots are not part of any stage
+_SNAPSHOT_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+
+class StageProfiler:
+    """Per-stage cProfile and tracemalloc accounting
+
+    :param stages: stage names, in report order
+    :param top: functions and allocation sites listed per stage
+    """
+    def __init__(self, stages, top=15):
+        self.stages = list(stages)
+        self.top = top
+        self.profiles = {stage: cProfile.Profile() for stage in stages}
+        self.wall = {stage: 0.0 for stage in stages}
+        self.runs = {stage: 0 for stage in stages}
+        self.peak = {stage: 0 for stage in stages}
+        self.net = {stage: 0 for stage in stages}
+        self.sites = {stage: {} for stage in stages}
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Profile the enclosed block, on the current thread, as a stage"""
+        before = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        began = time.perf_counter()
+        self.profiles[name].enable()
+        try:
+            yield
+        finally:
+            self.profiles[name].disable()
+            self.wall[name] += time.perf_counter() - began
+            self.runs[name] += 1
+            after, peak = tracemalloc.get_traced_memory()
+            self.peak[name] = max(self.peak[name], peak - current)
+            self.net[name] += after - current
+            sites = self.sites[name]
+            after_snapshot = tracemalloc.take_snapshot().filter_traces(
+                _SNAPSHOT_FILTERS)
+            for stat in after_snapshot.compare_to(before, 'lineno'):
+                if stat.size_diff:
+                    site = str(stat.traceback)
+                    sites[site] = sites.get(site, 0) + stat.size_diff
+
+    async def profiled(self, name, coro):
+        """Await a coroutine as a stage, on the event loop's thread"""
+        with self.stage(name):
+            return await coro
+
+    def report(self):
+        """Summary of every stage as text"""
+        out = io.StringIO()
+        total = sum(self.wall.values())
+        out.write('SSH2Influx stage profile\n')
+        out.write(f'{"stage":<10} {"runs":>5} {"wall s":>10} {"share":>7} '
+                  f'{"peak KiB":>10} {"net KiB":>10}\n')
+        for stage in self.stages:
+            share = self.wall[stage] / total * 100 if total else 0
+            out.write(f'{stage:<10} {self.runs[stage]:>5} '
+                      f'{self.wall[stage]:>10.3f} {share:>6.1f}% '
+                      f'{self.peak[stage] / 1024:>10.1f} '
+                      f'{self.net[stage] / 1024:>10.1f}\n')
+        for stage in self.stages:
+            if not self.runs[stage]:
+                continue
+            out.write(f'\n===== {stage}: top {self.top} functions by '
+                      f'cumulative time\n')
+            stats = pstats.Stats(self.profiles[stage], stream=out)
+            stats.strip_dirs().sort_stats('cumulative').print_stats(self.top)
+            out.write(f'===== {stage}: top {self.top} allocation sites '
+                      f'(net bytes over all runs)\n')
+            sites = sorted(self.sites[stage].items(),
+                           key=lambda item: abs(item[1]), reverse=True)
+            for site, size in sites[:self.top]:
+                out.write(f'{size:>12} {site}\n')
+        return out.getvalue()
+
+    def dump(self, prefix):
+        """Write each profiled stage to <prefix>.<stage>.prof"""
+        paths = []
+        for stage in self.stages:
+            if self.runs[stage]:
+                path = f'{prefix}.{stage}.prof'
+                self.profiles[stage].dump_stats(path)
+                paths.append(path)
+        return paths
+
+    def stop(self):
+        tracemalloc.stop()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Disk spool for line protocol that could not be written to InfluxDB
+ (writeSpool.py)
+
+Batches the writer gives up on (InfluxDB down for maintenance, network
+outage, ...) are appended to segment files in a spool directory instead
+of being dropped.  A background drainer thread replays the oldest
+segments at a controlled rate once the server accepts writes again, so
+new polling cycles are never held up by the backlog.  Points keep their
+original collection timestamps.
+
+Segments are append-only text files of line protocol.  The segment
+being written is named <sequence>.lp.open and is sealed (renamed to
+<sequence>.lp) when it reaches its size or age limit; only sealed
+segments are replayed.  The sequence is the segment's creation time in
+milliseconds.  When the spool grows past its size cap, or segments pass
+the age cap, the oldest segments are deleted first.  Only batches that
+may be accepted later are spooled; a replayed batch InfluxDB rejects
+for good (bad data, auth or bucket) is dropped.
+
+Spool settings are optional keys on the InfluxDB entry in
+optionsconfig.yaml (defaults shown)
+    InfluxDB:
+      ...
+      spool_max_mb: 1024         # total spool size cap
+      spool_max_age_hours: 24    # discard spooled data older than this
+      spool_segment_mb: 16       # seal segments at this size
+      spool_drain_rate: 20000    # most lines per second replayed
+
+Required inputs/variables:
+    directory - spool directory for one Influx target
+    writer - InfluxWriter used to replay spooled data
+
+Outputs:
+    line protocol replayed to InfluxDB by the drainer thread
+
+Version log:
+v1   2026-1017  Created to keep telemetry through InfluxDB outages
+v2   2026-1017  Rejected batches dropped on replay; segments aged by
+    their sequence, not their modification time
+
+Credits:
+"""
+__version__ = '2'
+__author__ = 'Jason Davis - jadavis@cisco.com'
+__license__ = "Cisco Sample Code License, Version 1.1 - https://developer.cisco.com/site/license/cisco-sample-code-license/"
+
+import logging
+import os
+import threading
+import time
+
+SEALED = '.lp'
+OPEN = '.lp.open'
+
+
+class WriteSpool:
+    """Segmented append-only spool with a background drainer
+
+    :param directory: directory holding this target's segments
+    :param writer: InfluxWriter used to replay segments
+    :param max_bytes: total spool size cap; oldest segments are evicted
+    :param max_age: seconds before a segment is discarded unsent
+    :param segment_bytes: size at which a segment is sealed
+    :param segment_age: seconds after which a segment is sealed
+    :param drain_rate: most lines per second replayed
+    :param retry_interval: seconds to wait after a failed replay
+    """
+    def __init__(self, directory, writer, max_bytes=1024 * 1024 * 1024,
+                 max_age=24 * 3600, segment_bytes=16 * 1024 * 1024,
+                 segment_age=60, drain_rate=20000, retry_interval=30):
+        self.directory = directory
+        self.writer = writer
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.segment_bytes = segment_bytes
+        self.segment_age = segment_age
+        self.drain_rate = drain_rate
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        # Anything left open by an earlier run is ready to replay
+        for name in os.listdir(directory):
+            if name.endswith(OPEN):
+                path = os.path.join(directory, name)
+                os.replace(path, path[:-len(OPEN)] + SEALED)
+        self._open_path = None
+        self._open_started = 0
+        self._thread = threading.Thread(target=self._drain_loop,
+                                        name=f'SpoolDrain-{writer.alias}',
+                                        daemon=True)
+        self._thread.start()
+
+    def _segments(self):
+        # Sealed segment paths, oldest first
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.endswith(SEALED))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _next_sequence(self):
+        names = [name for name in os.listdir(self.directory)
+                 if name.endswith(SEALED) or name.endswith(OPEN)]
+        last = max((int(name.split('.')[0]) for name in names), default=0)
+        return max(last + 1, int(time.time() * 1000))
+
+    def _seal(self):
+        if self._open_path is not None:
+            os.replace(self._open_path,
+                       self._open_path[:-len(OPEN)] + SEALED)
+            self._open_path = None
+
+    def append(self, batches):
+        """Spool batches of line protocol
+
+        :param batches: list of line protocol strings
+        :returns: number of lines spooled
+        """
+        data = ''.join(batch if batch.endswith('\n') else batch + '\n'
+                       for batch in batches)
+        if not data:
+            return 0
+        with self._lock:
+            if self._open_path is None:
+                self._open_path = os.path.join(
+                    self.directory, f'{self._next_sequence():015d}{OPEN}')
+                self._open_started = time.time()
+            with open(self._open_path, 'a', encoding='utf-8') as segment:
+                segment.write(data)
+            if (os.path.getsize(self._open_path) >= self.segment_bytes or
+                    time.time() - self._open_started >= self.segment_age):
+                self._seal()
+            self._enforce_caps()
+        self._wake.set()
+        return data.count('\n')
+
+    def _enforce_caps(self):
+        # Drop the oldest sealed segments when over the age or size cap
+        now = time.time()
+        segments = self._segments()
+        sizes = {path: os.path.getsize(path) for path in segments}
+        total = sum(sizes.values())
+        if self._open_path is not None:
+            total += os.path.getsize(self._open_path)
+        for path in segments:
+            # Replays rewrite a segment, so its mtime is no guide to age
+            created = int(os.path.basename(path).split('.')[0]) / 1000
+            too_old = now - created > self.max_age
+            if not too_old and total <= self.max_bytes:
+                break
+            total -= sizes[path]
+            os.remove(path)
+            print(f'WARNING: Spool for {self.writer.alias} discarded '
+                  f'{os.path.basename(path)} '
+                  f'({"too old" if too_old else "spool full"})')
+
+    def depth(self):
+        """Current spool size as (segments, bytes), including open data"""
+        with self._lock:
+            paths = self._segments()
+            if self._open_path is not None:
+                paths.append(self._open_path)
+            return len(paths), sum(os.path.getsize(path) for path in paths)
+
+    def _replay(self, path):
+        # Replay one segment at the drain rate; returns True when it has
+        # been fully written and removed
+        with open(path, 'r', encoding='utf-8') as segment:
+            lines = segment.readlines()
+        chunk = max(min(self.writer.batch_lines, self.drain_rate), 1)
+        dropped = 0
+        for start in range(0, len(lines), chunk):
+            began = time.monotonic()
+            failed, rejected = self.writer.write(
+                ''.join(lines[start:start + chunk]))
+            if rejected:
+                count = sum(batch.count('\n') for batch in rejected)
+                dropped += count
+                print(f'WARNING: InfluxDB {self.writer.alias} rejected '
+                      f'{count} spooled lines - dropping them')
+            if failed:
+                # Keep what is left, in order, for the next attempt
+                remaining = ''.join(failed) + ''.join(lines[start + chunk:])
+                with self._lock:
+                    if os.path.exists(path):
+                        temp = path + '.tmp'
+                        with open(temp, 'w', encoding='utf-8') as segment:
+                            segment.write(remaining)
+                        os.replace(temp, path)
+                return False
+            pause = chunk / self.drain_rate - (time.monotonic() - began)
+            if pause > 0 and self._stop.wait(pause):
+                return False
+        with self._lock:
+            if os.path.exists(path):
+                os.remove(path)
+        print(f'Replayed {len(lines) - dropped} spooled lines to InfluxDB '
+              f'{self.writer.alias}')
+        return True
+
+    def _drain_loop(self):
+        while not self._stop.is_set():
+            with self._lock:
+                if (self._open_path is not None and
+                        time.time() - self._open_started >= self.segment_age):
+                    self._seal()
+                self._enforce_caps()
+                segments = self._segments()
+            if not segments:
+                self._wake.wait(self.segment_age)
+                self._wake.clear()
+                continue
+            logging.debug('Spool for %s has %d segment(s) to replay',
+                          self.writer.alias, len(segments))
+            if not self._replay(segments[0]):
+                self._stop.wait(self.retry_interval)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()